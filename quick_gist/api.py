@@ -1,10 +1,17 @@
 import json
 import logging
+import os
+import pathlib
+import time
+from typing import List
 from typing import NamedTuple
 from typing import Optional
 
 import requests
 
+from quick_gist.metrics import _observe_histogram
+from quick_gist.metrics import _set_gauge
+
 GITHUB_API_ENDPOINT = "https://api.github.com"
 
 
@@ -20,10 +27,35 @@ class GithubApiError(Exception):
         exit(1)
 
 
+def _record_api_response(
+    endpoint: str,
+    response: requests.Response,
+    duration: float,
+    authenticated: bool = True,
+) -> None:
+    """Record the latency and remaining rate limit of a Github API response"""
+    _observe_histogram(
+        "quick_gist_api_request_duration_seconds",
+        {"endpoint": endpoint},
+        duration,
+    )
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    # unauthenticated requests have their own (much lower) rate limit
+    if authenticated and remaining is not None:
+        _set_gauge("quick_gist_rate_limit_remaining", {}, float(remaining))
+
+
 def _validate_github_username(username: str) -> None:
     """Validate if the given github username exists"""
     url = f"{GITHUB_API_ENDPOINT}/users/{username}"
+    start_time = time.perf_counter()
     ret = requests.get(url.format(username))
+    _record_api_response(
+        "get_user",
+        ret,
+        time.perf_counter() - start_time,
+        authenticated=False,
+    )
     ret_text = ret.json()
     if ret.ok:
         username_exists = False
@@ -52,7 +84,9 @@ def _validate_github_user_apitoken(username: str, api_token: str) -> None:
     """
     url = f"{GITHUB_API_ENDPOINT}/users/{username}"
     headers = {"Authorization": f"token {api_token}"}
+    start_time = time.perf_counter()
     ret = requests.get(url.format(username), headers=headers)
+    _record_api_response("get_user", ret, time.perf_counter() - start_time)
     ret_text = ret.json()
     if ret.ok:
         if "gist" not in ret.headers["X-OAuth-Scopes"]:
@@ -64,7 +98,23 @@ def _validate_github_user_apitoken(username: str, api_token: str) -> None:
             raise GithubApiError("Failed to connect to github api endpoint")
 
 
-def _post_github_gist(gist_content: GistContent, api_token: str) -> Optional[str]:
+def _prewarm_github_session(session: requests.Session) -> None:
+    """
+    Open the (TLS) connection to the Github API ahead of time,
+    so that the following requests of the session can reuse it
+    """
+    try:
+        # requests to the rate limit endpoint do not count against the rate limit
+        session.get(f"{GITHUB_API_ENDPOINT}/rate_limit", timeout=10)
+    except requests.exceptions.RequestException:
+        logging.debug("Could not pre-warm the connection to the Github API")
+
+
+def _post_github_gist(
+    gist_content: GistContent,
+    api_token: str,
+    session: Optional[requests.Session] = None,
+) -> Optional[str]:
     """Create a new github gist from a given file list and description and return gist url"""
     # form a request URL
     url = GITHUB_API_ENDPOINT + "/gists"
@@ -80,12 +130,14 @@ def _post_github_gist(gist_content: GistContent, api_token: str) -> Optional[str
 
     try:
         # try to post the github gist
-        res = requests.post(
+        start_time = time.perf_counter()
+        res = (session or requests).post(  # type: ignore
             url,
             headers=headers,
             params=params,
             data=json.dumps(payload),
         )
+        _record_api_response("create_gist", res, time.perf_counter() - start_time)
         status_code = res.status_code
         if status_code == 201:
             # successfully created new githib gist
@@ -108,3 +160,132 @@ def _post_github_gist(gist_content: GistContent, api_token: str) -> Optional[str
         GithubApiError(f"Failed to create gist (connection error)")
 
         return None
+
+
+def _list_github_gists(api_token: str, since: Optional[str] = None) -> List[dict]:
+    """List all gists of the authenticated user (only those updated since 'since')"""
+    url: Optional[str] = GITHUB_API_ENDPOINT + "/gists"
+    headers = {"Authorization": f"token {api_token}"}
+    params: Optional[dict] = {"per_page": 100}
+    if since is not None:
+        params["since"] = since  # type: ignore
+
+    gists: List[dict] = []
+    while url is not None:
+        try:
+            start_time = time.perf_counter()
+            res = requests.get(url, headers=headers, params=params)
+            _record_api_response("list_gists", res, time.perf_counter() - start_time)
+        except requests.exceptions.ConnectionError:
+            raise GithubApiError("Failed to list gists (connection error)")
+        if res.status_code != 200:
+            raise GithubApiError(
+                f"Failed to list gists. API error: {res.json().get('message')}",
+            )
+        gists.extend(res.json())
+        # the url of the next page already contains all parameters
+        url = res.links.get("next", {}).get("url")
+        params = None
+
+    return gists
+
+
+def _download_github_raw_file(raw_url: str, path: pathlib.Path) -> int:
+    """Stream the raw content of a gist file to disk and return the number of bytes"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    size = 0
+    with requests.get(raw_url, stream=True, timeout=60) as res:
+        res.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for chunk in res.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+                size += len(chunk)
+    os.replace(tmp_path, path)
+
+    return size
+
+
+def _rate_limit_wait_time(response: requests.Response) -> Optional[float]:
+    """Return the seconds to wait if a response reports an exceeded rate limit"""
+    if response.status_code not in (403, 429):
+        return None
+    if "Retry-After" in response.headers:
+        return float(response.headers["Retry-After"])
+    if (
+        response.headers.get("X-RateLimit-Remaining") == "0"
+        and "X-RateLimit-Reset" in response.headers
+    ):
+        return max(0.0, float(response.headers["X-RateLimit-Reset"]) - time.time()) + 1
+
+    return None
+
+
+def _delete_github_gist(gist_id: str, api_token: str) -> requests.Response:
+    """Delete a github gist and return the API response"""
+    url = f"{GITHUB_API_ENDPOINT}/gists/{gist_id}"
+    headers = {"Authorization": f"token {api_token}"}
+    start_time = time.perf_counter()
+    res = requests.delete(url, headers=headers)
+    _record_api_response("delete_gist", res, time.perf_counter() - start_time)
+
+    return res
+
+
+def _list_github_gist_commits(gist_id: str, api_token: str) -> List[dict]:
+    """List all revisions of a gist (newest first)"""
+    url: Optional[str] = f"{GITHUB_API_ENDPOINT}/gists/{gist_id}/commits"
+    headers = {"Authorization": f"token {api_token}"}
+    params: Optional[dict] = {"per_page": 100}
+
+    commits: List[dict] = []
+    while url is not None:
+        try:
+            start_time = time.perf_counter()
+            res = requests.get(url, headers=headers, params=params)
+            _record_api_response(
+                "list_gist_commits",
+                res,
+                time.perf_counter() - start_time,
+            )
+        except requests.exceptions.ConnectionError:
+            raise GithubApiError("Failed to list gist revisions (connection error)")
+        if res.status_code != 200:
+            raise GithubApiError(
+                f"Failed to list gist revisions. API error: {res.json().get('message')}",
+            )
+        commits.extend(res.json())
+        # the url of the next page already contains all parameters
+        url = res.links.get("next", {}).get("url")
+        params = None
+
+    return commits
+
+
+def _get_github_gist_revision(gist_id: str, version: str, api_token: str) -> dict:
+    """Get a gist at a specific revision"""
+    url = f"{GITHUB_API_ENDPOINT}/gists/{gist_id}/{version}"
+    headers = {"Authorization": f"token {api_token}"}
+    try:
+        start_time = time.perf_counter()
+        res = requests.get(url, headers=headers)
+        _record_api_response("get_gist_revision", res, time.perf_counter() - start_time)
+    except requests.exceptions.ConnectionError:
+        raise GithubApiError("Failed to get gist revision (connection error)")
+    if res.status_code != 200:
+        raise GithubApiError(
+            f"Failed to get gist revision. API error: {res.json().get('message')}",
+        )
+
+    return res.json()
+
+
+def _get_github_raw_content(raw_url: str) -> bytes:
+    """Get the raw content of a (truncated) gist file"""
+    try:
+        res = requests.get(raw_url, timeout=60)
+    except requests.exceptions.ConnectionError:
+        raise GithubApiError("Failed to download gist file (connection error)")
+    if res.status_code != 200:
+        raise GithubApiError(f"Failed to download gist file from {raw_url}")
+
+    return res.content
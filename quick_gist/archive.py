@@ -0,0 +1,90 @@
+import io
+import pathlib
+import tarfile
+import zipfile
+from typing import Callable
+from typing import Dict
+from typing import IO
+from typing import Set
+from typing import TypeVar
+
+T = TypeVar("T")
+
+ARCHIVE_SUFFIXES = (
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+    ".zip",
+)
+
+
+def _normalize_member_name(member_name: str) -> str:
+    """Normalize archive member names, e.g. './logs/test.log' -> 'logs/test.log'"""
+    while member_name.startswith("./"):
+        member_name = member_name[2:]
+    return member_name
+
+
+class _StreamedTarMember(io.RawIOBase):
+    """
+    Member of a streamed tar archive (the file objects of tarfile fail on
+    seekable() in stream mode, which e.g. io.TextIOWrapper calls)
+    """
+
+    def __init__(self, member_file: IO[bytes]):
+        self._member_file = member_file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._member_file.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _read_archive_members(
+    archive_path: pathlib.Path,
+    member_names: Set[str],
+    read_member: Callable[[str, IO[bytes]], T],
+) -> Dict[str, T]:
+    """
+    Stream the given members of a tar or zip archive into read_member without
+    extracting it, opening the archive only once (missing members are not returned)
+    """
+    wanted_names = {_normalize_member_name(name) for name in member_names}
+    members: Dict[str, T] = {}
+    try:
+        if zipfile.is_zipfile(archive_path):
+            # zip archives have a central directory and allow random access
+            with zipfile.ZipFile(archive_path) as zip_file:
+                for info in zip_file.infolist():
+                    name = _normalize_member_name(info.filename)
+                    if name in wanted_names and not info.is_dir():
+                        with zip_file.open(info) as zip_member_file:
+                            members[name] = read_member(name, zip_member_file)
+        else:
+            # read (compressed) tar archives as a stream in one sequential pass
+            with tarfile.open(archive_path, "r|*") as tar_file:
+                for tar_info in tar_file:
+                    name = _normalize_member_name(tar_info.name)
+                    if name not in wanted_names or not tar_info.isfile():
+                        continue
+                    member_file = tar_file.extractfile(tar_info)
+                    if member_file is not None:
+                        # only the part of the member that is needed gets read
+                        members[name] = read_member(
+                            name,
+                            io.BufferedReader(_StreamedTarMember(member_file)),
+                        )
+                    # stop as soon as all members were found
+                    if len(members) == len(wanted_names):
+                        break
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError) as e:
+        raise OSError(f"Could not read archive '{archive_path}'") from e
+
+    return members
@@ -1,35 +1,109 @@
 import argparse
 import getpass
+import io
 import itertools
+import json
 import logging
 import os
 import pathlib
 import re
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import Future
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
 from pathlib import Path
+from typing import Any
 from typing import Callable
+from typing import Dict
+from typing import IO
+from typing import Iterable
 from typing import List
 from typing import NamedTuple
+from typing import Optional
+from typing import Pattern
+from typing import TextIO
 from typing import Tuple
+from typing import TypeVar
+from typing import Union
 
+import requests
+
+from quick_gist.api import _list_github_gist_commits
+from quick_gist.api import _list_github_gists
 from quick_gist.api import _post_github_gist
+from quick_gist.api import _prewarm_github_session
 from quick_gist.api import _validate_github_user_apitoken
 from quick_gist.api import _validate_github_username
 from quick_gist.api import GistContent
+from quick_gist.archive import _normalize_member_name
+from quick_gist.archive import _read_archive_members
+from quick_gist.archive import ARCHIVE_SUFFIXES
+from quick_gist.completion import _completion_script
+from quick_gist.completion import _write_completion_cache
+from quick_gist.completion import COMPLETION_CACHE_PATH
 from quick_gist.credentials import _check_user_config_existance
 from quick_gist.credentials import _create_default_user_config
 from quick_gist.credentials import _create_user_config_dir
 from quick_gist.credentials import _password_decrypt
 from quick_gist.credentials import _password_encrypt
+from quick_gist.credentials import _password_reencrypt
 from quick_gist.credentials import _read_user_config
 from quick_gist.credentials import _write_user_config
 from quick_gist.credentials import UserCredentialsError
+from quick_gist.git import _read_git_diff
+from quick_gist.git import GitCatFile
+from quick_gist.history import _diff_revisions
+from quick_gist.history import _fetch_revision
+from quick_gist.history import _find_stored_versions
+from quick_gist.history import _load_revision
+from quick_gist.history import HEX_PATTERN
+from quick_gist.history import REVISION_STORE_PATH
+from quick_gist.metrics import _format_metrics
+from quick_gist.metrics import _increment_counter
+from quick_gist.metrics import _observe_histogram
+from quick_gist.metrics import _read_metrics
+from quick_gist.metrics import METRICS_PATH
+from quick_gist.mirror import _load_mirror_state
+from quick_gist.mirror import _mirror_gists
+from quick_gist.mirror import _save_mirror_state
+from quick_gist.prune import _delete_gists
+from quick_gist.prune import _gist_matches
+from quick_gist.prune import _prune_report_entry
+from quick_gist.prune import PruneFilter
+from quick_gist.scan import _scan_files
+from quick_gist.symbols import _get_symbol_index
 
 USER_CONFIG_PATH = str(os.getenv("HOME")) + "/.config/quick-gist/"
 USER_CONFIG_NAME = "quick-gist-config.yaml"
 FULL_CONFIG_PATH = Path(f"{USER_CONFIG_PATH}{USER_CONFIG_NAME}")
 
-NEW_SUBFILE_PATTERN = re.compile(r"^([\w\-. ]+?.\w+)\[([\d+\-\d+?,]+)\]$")
+NEW_SUBFILE_PATTERN = re.compile(r"^([\w\-. ]+?.\w+)\[(.+)\]$")
+# e.g. HEAD~3:src/app.py[10-40]
+GIT_SUBFILE_PATTERN = re.compile(r"^([^:\[\]]+):([^:\[\]]+?)(?:\[(.+)\])?$")
+# e.g. build.tar.gz::logs/test.log[100-200]
+ARCHIVE_SUBFILE_PATTERN = re.compile(
+    r"^(.+?(?:%s))::([^\[\]]+?)(?:\[(.+)\])?$"
+    % "|".join(re.escape(suffix) for suffix in ARCHIVE_SUFFIXES),
+)
+# e.g. file.py[def:MyClass.method]
+SYMBOL_SELECTOR_PREFIX = "def:"
+# e.g. log.txt[/ERROR/,+50] or log.txt[/BEGIN/../END/]
+REGEX_SELECTOR_PATTERN = re.compile(
+    r"/((?:[^/\\]|\\.)+)/(?:\.\./((?:[^/\\]|\\.)+)/)?(?:,\+(\d+))?(?=,|$)",
+)
+
+# states of a line selection while streaming through a file
+SELECTION_SEARCHING = "searching"
+SELECTION_UNTIL_END = "until_end"
+SELECTION_CONTEXT = "context"
+SELECTION_DONE = "done"
+SELECTION_SKIPPED = "skipped"
+
+T = TypeVar("T")
 
 
 class term_colors:
@@ -43,9 +117,22 @@ class UserCommandError(Exception):
         exit(1)
 
 
+class RegexSelection(NamedTuple):
+    start: Pattern
+    end: Optional[Pattern]
+    context: int
+    text: str
+
+
+# either a (first, last) line pair, the name of a symbol or a regex selection
+LineBlock = Union[Tuple[int, int], str, RegexSelection]
+
+
 class FileDescriptor(NamedTuple):
     path: pathlib.Path
-    line_descriptor: List[Tuple[int, int]]
+    line_descriptor: List[LineBlock]
+    revision: Optional[str] = None
+    archive: Optional[pathlib.Path] = None
 
 
 def _get_user_input(msg: str, validation_function: Callable[..., bool]) -> str:
@@ -58,73 +145,546 @@ def _get_user_input(msg: str, validation_function: Callable[..., bool]) -> str:
             print("Invalid input, please try again")
 
 
+def _select_lines(
+    lines: Iterable[str],
+    line_blocks: List[LineBlock],
+    file_name: str,
+) -> str:
+    """
+    Select the given line blocks in a single pass over the lines,
+    stopping as soon as all selections are complete
+    """
+    # state and selected lines of every line block
+    states: List[str] = []
+    selected_lines: List[List[str]] = [[] for _ in line_blocks]
+    context_lines: List[int] = [0 for _ in line_blocks]
+    for line_pair in line_blocks:
+        if isinstance(line_pair, RegexSelection):
+            states.append(SELECTION_SEARCHING)
+            continue
+        # symbol selections are resolved before the lines are selected
+        assert isinstance(line_pair, tuple)
+        first_line, second_line = line_pair
+        # wrong order of line numbers
+        if second_line < first_line:
+            logging.warning(
+                f"First line number must be lower "
+                f"then the second one (skipping "
+                f"'{file_name}',{line_pair})",
+            )
+            states.append(SELECTION_SKIPPED)
+        elif first_line <= 0:
+            logging.warning(
+                f"Line {first_line} does not exist in '{file_name}' (skipping)",
+            )
+            states.append(SELECTION_SKIPPED)
+        else:
+            states.append(SELECTION_SEARCHING)
+
+    number_open = states.count(SELECTION_SEARCHING)
+    line_number = 0
+    # nothing has to be read if all selections were skipped
+    lines_to_read = lines if number_open != 0 else []
+    for line in lines_to_read:
+        line_number += 1
+        for i, line_pair in enumerate(line_blocks):
+            state = states[i]
+            if state in (SELECTION_DONE, SELECTION_SKIPPED):
+                continue
+            if isinstance(line_pair, RegexSelection):
+                if state == SELECTION_SEARCHING:
+                    if not line_pair.start.search(line):
+                        continue
+                    selected_lines[i].append(line)
+                    if line_pair.end is not None:
+                        state = SELECTION_UNTIL_END
+                    elif line_pair.context > 0:
+                        state = SELECTION_CONTEXT
+                        context_lines[i] = line_pair.context
+                    else:
+                        state = SELECTION_DONE
+                elif state == SELECTION_UNTIL_END:
+                    selected_lines[i].append(line)
+                    assert line_pair.end is not None
+                    if line_pair.end.search(line):
+                        if line_pair.context > 0:
+                            state = SELECTION_CONTEXT
+                            context_lines[i] = line_pair.context
+                        else:
+                            state = SELECTION_DONE
+                elif state == SELECTION_CONTEXT:
+                    selected_lines[i].append(line)
+                    context_lines[i] -= 1
+                    if context_lines[i] == 0:
+                        state = SELECTION_DONE
+            else:
+                assert isinstance(line_pair, tuple)
+                first_line, second_line = line_pair
+                if line_number >= first_line:
+                    selected_lines[i].append(line)
+                if line_number == second_line:
+                    state = SELECTION_DONE
+            if state == SELECTION_DONE:
+                number_open -= 1
+            states[i] = state
+        # stop reading as soon as all selections are complete
+        if number_open == 0:
+            break
+
+    content = ""
+    for i, line_pair in enumerate(line_blocks):
+        state = states[i]
+        if isinstance(line_pair, RegexSelection):
+            if state == SELECTION_SEARCHING:
+                logging.warning(
+                    f"No line matches '{line_pair.text}' in file "
+                    f"'{file_name}' (skipping)",
+                )
+                continue
+            elif state == SELECTION_UNTIL_END:
+                logging.warning(
+                    f"No line matches the end of '{line_pair.text}' in file "
+                    f"'{file_name}' (skipping)",
+                )
+                continue
+            logging.debug(f"Including lines '{line_pair.text}' in file '{file_name}'")
+        elif state == SELECTION_SEARCHING:
+            assert isinstance(line_pair, tuple)
+            first_line, second_line = line_pair
+            # line number does not exist
+            logging.warning(
+                f"Line {second_line} does not exist in file "
+                f"'{file_name}' (skipping lines [{first_line}-{second_line}])",
+            )
+            continue
+        elif state == SELECTION_DONE:
+            logging.debug(f"Including lines {line_pair} in file '{file_name}'")
+        # context selections that reached the end of the file are included as well
+        content += "".join(selected_lines[i])
+
+    return content
+
+
+def _resolve_line_blocks(
+    all_lines: List[str],
+    line_blocks: List[LineBlock],
+    file_name: str,
+) -> List[LineBlock]:
+    """Resolve symbol names in the line blocks into their line numbers"""
+    resolved_blocks: List[LineBlock] = []
+    if all(not isinstance(line_block, str) for line_block in line_blocks):
+        return line_blocks
+
+    symbol_index = _get_symbol_index("".join(all_lines), file_name)
+    for line_block in line_blocks:
+        if not isinstance(line_block, str):
+            resolved_blocks.append(line_block)
+        elif line_block in symbol_index:
+            resolved_blocks.append(symbol_index[line_block])
+            logging.debug(f"Resolved symbol '{line_block}' in file '{file_name}'")
+        else:
+            logging.warning(
+                f"Symbol '{line_block}' does not exist in '{file_name}' (skipping)",
+            )
+
+    return resolved_blocks
+
+
+def _select_content(text: str, line_blocks: List[LineBlock], file_name: str) -> str:
+    """Select the given line blocks from text that was already read in"""
+    if len(line_blocks) == 0:
+        return text
+    all_lines = text.splitlines(keepends=True)
+    return _select_lines(
+        all_lines,
+        _resolve_line_blocks(all_lines, line_blocks, file_name),
+        file_name,
+    )
+
+
+def _select_file_content(
+    f: TextIO,
+    line_blocks: List[LineBlock],
+    file_name: str,
+) -> str:
+    """Select the given line blocks from an opened file, streaming it if possible"""
+    if len(line_blocks) == 0:
+        logging.debug(f"Including all lines from file '{file_name}'")
+        return f.read()
+    elif any(isinstance(b, str) for b in line_blocks):
+        # symbols can only be resolved with the whole file
+        all_lines = f.readlines()
+        return _select_lines(
+            all_lines,
+            _resolve_line_blocks(all_lines, line_blocks, file_name),
+            file_name,
+        )
+    # stream the file instead of reading it into a list
+    return _select_lines(f, line_blocks, file_name)
+
+
+def _read_archive_contents(
+    archive: pathlib.Path,
+    files: List[FileDescriptor],
+) -> Dict[int, str]:
+    """
+    Select the content of all files of an archive in one pass over the archive
+    (returns the content by the index of the file, missing members are not returned)
+    """
+    indices_by_member: Dict[str, List[int]] = {}
+    for i, file in enumerate(files):
+        if file.archive == archive:
+            member_name = _normalize_member_name(file.path.as_posix())
+            indices_by_member.setdefault(member_name, []).append(i)
+
+    def select_member(member_name: str, member_file: IO[bytes]) -> Dict[int, str]:
+        indices = indices_by_member[member_name]
+        text_file = io.TextIOWrapper(member_file, encoding="utf-8", errors="replace")
+        if len(indices) == 1:
+            i = indices[0]
+            return {
+                i: _select_file_content(
+                    text_file,
+                    files[i].line_descriptor,
+                    files[i].path.name,
+                ),
+            }
+        # a member that is selected more than once can only be streamed once
+        text = text_file.read()
+        return {
+            i: _select_content(text, files[i].line_descriptor, files[i].path.name)
+            for i in indices
+        }
+
+    contents: Dict[int, str] = {}
+    for member_contents in _read_archive_members(
+        archive,
+        set(indices_by_member),
+        select_member,
+    ).values():
+        contents.update(member_contents)
+
+    return contents
+
+
+def _gist_file_names(files: List[FileDescriptor]) -> List[str]:
+    """
+    Name every file in the gist after its file name or, if that name is used more
+    than once, after its source and path (gist file names have to be unique)
+    """
+    file_names = [file.path.name for file in files]
+    names = list(file_names)
+    for i, file in enumerate(files):
+        if file_names.count(file.path.name) == 1:
+            continue
+        name = file.path.as_posix().replace("/", "_")
+        if file.revision is not None:
+            name = f"{file.revision.replace('/', '_')}_{name}"
+        elif file.archive is not None:
+            name = f"{file.archive.name}_{name}"
+        names[i] = name
+
+    # the same file might still be selected more than once
+    used_names = set()
+    for i, name in enumerate(names):
+        number = 1
+        while names[i] in used_names:
+            number += 1
+            path = pathlib.PurePosixPath(name)
+            names[i] = f"{path.stem}_{number}{path.suffix}"
+        used_names.add(names[i])
+
+    return names
+
+
 def _read_files(files: List[FileDescriptor], softfail=False) -> dict:
     """Read in file content as described in the list of FileDescriptors"""
     parsed_files = OrderedDict()
-    for file, line_blocks in files:
-        # create a new empty content field for each new file
-        content = ""
-        file_path = file.resolve()
-        try:
-            with open(file_path, "r") as f:
-                if len(line_blocks) == 0:
-                    content = f.read()
-                    logging.debug("Including all lines from file '{file.name}'")
-                else:
-                    all_lines = f.readlines()
-                    for line_pair in line_blocks:
-                        first_line, second_line = line_pair[0], line_pair[1]
-                        # wrong order of line numbers
-                        if second_line < first_line:
-                            logging.warning(
-                                f"First line number must be lower "
-                                f"then the second one (skipping "
-                                f"'{file.name}',{line_pair})",
-                            )
-                        elif first_line <= 0:
-                            logging.warning(
-                                f"Line {first_line} does not exist in "
-                                f"'{file.name}' (skipping)",
-                            )
-                        # line number does not exist
-                        elif second_line > len(all_lines):
-                            logging.warning(
-                                f"Line {second_line} does not exist in file "
-                                f"'{file.name}' (skipping lines [{first_line}-{second_line}])",
-                            )
-                        # if both lines are the same, include exactly that line
-                        elif first_line == second_line:
-                            content += all_lines[first_line - 1]
-                            logging.debug(
-                                f"Including line {first_line} in file {file.name}",
-                            )
-                        # otherwise read specific lines
-                        else:
-                            content += "".join(
-                                all_lines[first_line - 1 : second_line],
-                            )
-                            logging.debug(
-                                "Including lines {first_line}-"
-                                f"{second_line} in file '{file.name}'",
+    gist_file_names = _gist_file_names(files)
+    # all files from git revisions are read through one cat-file process
+    git_cat_file: Optional[GitCatFile] = None
+    # every archive is streamed once, only the selected content of its members is kept
+    archive_contents: Dict[pathlib.Path, Optional[Dict[int, str]]] = {}
+    try:
+        for i, ((file, line_blocks, revision, archive), gist_file_name) in enumerate(
+            zip(files, gist_file_names),
+        ):
+            # create a new empty content field for each new file
+            content = ""
+            try:
+                if revision is not None:
+                    if git_cat_file is None:
+                        git_cat_file = GitCatFile()
+                    blob = git_cat_file.read(f"{revision}:{file.as_posix()}")
+                    content = _select_content(
+                        blob.decode("utf-8", errors="replace"),
+                        line_blocks,
+                        file.name,
+                    )
+                elif archive is not None:
+                    if archive not in archive_contents:
+                        try:
+                            archive_contents[archive] = _read_archive_contents(
+                                archive,
+                                files,
                             )
-                        # otherwise read specific lines
+                        except OSError:
+                            archive_contents[archive] = None
+                            raise
+                    contents = archive_contents[archive]
+                    if contents is None:
+                        raise OSError(f"Could not read archive '{archive}'")
+                    if i not in contents:
+                        raise FileNotFoundError(
+                            f"'{file}' does not exist in '{archive}'",
+                        )
+                    content = contents[i]
+                else:
+                    with open(file.resolve(), "r") as f:
+                        content = _select_file_content(f, line_blocks, file.name)
                 # create content object for api request
                 file_descriptor = {"content": content}
-                parsed_files[file.name] = file_descriptor
+                parsed_files[gist_file_name] = file_descriptor
 
-        except IOError:
-            if softfail:
-                logging.warning(
-                    f"Failed to open/read file '{file.name}' (skipping)",
-                )
+            except IOError:
+                if softfail:
+                    logging.warning(
+                        f"Failed to open/read file '{file.name}' (skipping)",
+                    )
+                else:
+                    raise UserCommandError(
+                        f"Failed to open/read file '{file.name}'(aborting)",
+                    )
+    finally:
+        if git_cat_file is not None:
+            git_cat_file.close()
+
+    return parsed_files
+
+
+def _parse_line_numbers(line_numbers_str: str) -> List[LineBlock]:
+    """
+    Parse line selections like '1-5,10,def:main,/BEGIN/../END/' into a list of
+    (first, last) line pairs, symbol names and regex selections
+    """
+    line_numbers: List[LineBlock] = []
+    position = 0
+    while position < len(line_numbers_str):
+        m = REGEX_SELECTOR_PATTERN.match(line_numbers_str, position)
+        if m:
+            # patterns are compiled once and evaluated while streaming the file
+            try:
+                start = re.compile(m.group(1))
+                end = re.compile(m.group(2)) if m.group(2) is not None else None
+            except re.error:
+                raise UserCommandError(f"Invalid regular expression in '{m.group(0)}'")
+            context = int(m.group(3)) if m.group(3) is not None else 0
+            line_numbers.append(RegexSelection(start, end, context, m.group(0)))
+            position = m.end() + 1
+            continue
+
+        section_end = line_numbers_str.find(",", position)
+        if section_end == -1:
+            section_end = len(line_numbers_str)
+        section = line_numbers_str[position:section_end]
+        position = section_end + 1
+
+        if section.startswith(SYMBOL_SELECTOR_PREFIX):
+            # symbols are resolved to line numbers once the file is read
+            line_numbers.append(section[len(SYMBOL_SELECTOR_PREFIX) :])
+            continue
+        # extract the line numbers from the matched string
+        try:
+            a, b = map(int, section.split("-"))
+        except ValueError:
+            # case when user typed in only one line number e.g. file.txt[10]
+            try:
+                a = b = int(section)
+            except ValueError:
+                raise UserCommandError(f"Invalid line selection '{section}'")
+        # add the line numbers to a list of sections that should be included
+        line_numbers.append((a, b))
+
+    return line_numbers
+
+
+def _parse_file_argument(file_argument: str) -> FileDescriptor:
+    """Parse one '-f/--files' argument into a FileDescriptor"""
+    line_numbers: List[LineBlock] = []
+    revision = None
+    archive = None
+    m_archive = re.match(ARCHIVE_SUBFILE_PATTERN, file_argument)
+    m_git = re.match(GIT_SUBFILE_PATTERN, file_argument)
+    m = re.match(NEW_SUBFILE_PATTERN, file_argument)
+    # existing files always win over archives and git revisions
+    # (e.g. a file name containing ':')
+    if m_archive and not Path(file_argument).exists():
+        # first group is the archive, second the member inside the archive
+        archive = Path(m_archive.group(1))
+        file_name = m_archive.group(2)
+        if m_archive.group(3) is not None:
+            line_numbers = _parse_line_numbers(m_archive.group(3))
+    elif m_git and not Path(file_argument).exists():
+        # first group is the git revision, second the path inside the repository
+        revision = m_git.group(1)
+        file_name = m_git.group(2)
+        if m_git.group(3) is not None:
+            line_numbers = _parse_line_numbers(m_git.group(3))
+    elif m:
+        # if there are no line numbers given, this section will be skipped
+        # first group of the matched string is the filename
+        file_name = m.group(1)
+        # second group of the matched string are the line numbers to include
+        line_numbers = _parse_line_numbers(str(m.group(2)))
+    else:
+        # remember only the file name, if there are no line numbers given in the argument
+        file_name = file_argument
+        # list of line numbers stays empty
+
+    # create a new FileDescriptor to remember the full file path and all lines to include
+    return FileDescriptor(Path(file_name), line_numbers, revision, archive)
+
+
+def _update_completion_cache(user_configuration: dict) -> None:
+    """Keep the shell completion cache in sync with the configured users"""
+    all_users = user_configuration["user"] or []
+    user_names = [list(user.keys())[0] for user in all_users]
+    try:
+        _write_completion_cache(user_names=user_names, path=COMPLETION_CACHE_PATH)
+    except OSError:
+        logging.warning("Could not update the shell completion cache")
+
+
+def _get_raw_api_token(user_name: str, user_settings: dict) -> str:
+    """Get the (possibly encrypted) api token of a user from its configured source"""
+    if user_settings["auth"] == "env":
+        # get user api token from ENV variable
+        try:
+            return os.environ[f"QUICK_GIST_{user_name.upper()}_AUTH"]
+        except KeyError:
+            raise UserCommandError(
+                msg=f"Could not find environment variable"
+                f"QUICK_GIST_{user_name.upper()}_AUTH",
+            )
+    else:
+        # get user api token from user confiuration file
+        return user_settings["auth"]
+
+
+def _select_user(user_configuration: dict, user_name: Optional[str]) -> str:
+    """Select the configured user to work with (the only one or the given one)"""
+    all_users = user_configuration["user"] or []
+    number_of_users = len(all_users)
+
+    if number_of_users == 0:
+        raise UserCommandError(
+            "No github user is configured (use command 'add-user' first)",
+        )
+    elif number_of_users == 1 and user_name is None:
+        user = all_users[0]
+        user_name = list(user.keys())[0]
+    else:
+        # if more then one user is configured, use the one from the command line argume
+        if user_name == None:
+            raise UserCommandError(
+                """Found more then one user in user configuration file
+                (use '-u/--user' to select one user)""",
+            )
+        # check if username exists in user configuration file
+        for user in all_users:
+            if list(user.keys())[0] == user_name:
+                # found user in user configuration file
+                break
+        else:
+            raise UserCommandError(
+                f"Given user '{user_name}' does not exist in user configuration file",
+            )
+
+    return user_name
+
+
+def _unlock_api_token(user_configuration: dict, user_name: str) -> str:
+    """Get the api token of a user and ask for the password if it is encrypted"""
+    for user in user_configuration["user"]:
+        if list(user.keys())[0] == user_name:
+            user_token_raw = _get_raw_api_token(user_name, user[user_name])
+
+            # check if api token is encrypted
+            if user[user_name]["encrypted"] == True:
+                # ask for password to decrypt the user api token
+                while True:
+                    psw = getpass.getpass(prompt="Password: ")
+                    try:
+                        start_time = time.perf_counter()
+                        user_token = _password_decrypt(
+                            token=user_token_raw.encode("utf-8"),
+                            password=psw,
+                        ).decode("utf-8")
+                        _observe_histogram(
+                            "quick_gist_kdf_unlock_duration_seconds",
+                            {"user": user_name},
+                            time.perf_counter() - start_time,
+                        )
+                        # valid password, break out of loop
+                        break
+                    except UserCredentialsError:
+                        # invalid password, stay in loop and ask again
+                        pass
             else:
-                raise UserCommandError(
-                    f"Failed to open/read file '{file.name}'(aborting)",
-                )
+                user_token = user_token_raw
+            # found user in user configuration and break out of loop
+            break
+
+    return user_token
+
+
+def _collect_files(
+    files_to_parse: List[FileDescriptor],
+    git_diff: Optional[str],
+    softfail: bool,
+    scan: Optional[str] = None,
+) -> dict:
+    """
+    Read all files and the optional git diff that should be included in a gist
+    and optionally scan them for secrets
+    """
+    parsed_files = _read_files(files=files_to_parse, softfail=softfail)
+
+    if git_diff is not None:
+        # include the diff between two git revisions as a separate file
+        diff_name = git_diff.replace("/", "_") + ".diff"
+        parsed_files[diff_name] = {"content": _read_git_diff(git_diff)}
+
+    for parsed_file in parsed_files.items():
+        if len(parsed_file[1]["content"]) != 0:
+            break
+        else:
+            raise UserCommandError("All files were skipped, noting to create")
+
+    # scan the selected content for secrets before anything is uploaded
+    if scan is not None:
+        parsed_files = _scan_files(files=parsed_files, policy=scan)
 
     return parsed_files
 
 
+def _run_in_background(function: Callable[..., T], *args: Any) -> "Future[T]":
+    """
+    Run a function in a daemon thread, which (unlike the threads of an executor)
+    does not keep the process alive if the command fails or is interrupted
+    """
+    future: "Future[T]" = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(function(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
 def command_add_user(args: argparse.Namespace) -> None:
     """Add a new github user to the quick-gist configuration"""
     # check if the config directory exists
@@ -211,6 +771,7 @@ The following options for getting your API token are available:
 
     # write down the new user configuration
     _write_user_config(FULL_CONFIG_PATH, user_configuration)
+    _update_completion_cache(user_configuration)
     logging.info(f"Successfully added user '{user_name}' to configuration")
     if api_token_conf == "env":
         print(
@@ -223,46 +784,26 @@ The following options for getting your API token are available:
 def command_new(args: argparse.Namespace) -> None:
     """Create a new github gist"""
 
-    files_argument = args.files
+    files_argument = args.files or []
+    if len(files_argument) == 0 and args.git_diff is None:
+        raise UserCommandError("Nothing to create (use '-f/--files' or '--git-diff')")
     # parse the file argument to create a list of files to parse
     # and remember which lines to include
-    files_to_parse: List[FileDescriptor] = []
-    for file_descriptor in files_argument:
-        line_numbers = []
-        m = re.match(NEW_SUBFILE_PATTERN, file_descriptor)
-        if m:
-            # if there are no line numbers given, this section will be skipped
-            # first group of the matched string is the filename
-            file_name = m.group(1)
-            # second group of the matched string are the line numbers to include
-            seperated_line_numbers = str(m.group(2)).split(",")
-            for section in seperated_line_numbers:
-                # extract the line numbers from the matched string
-                try:
-                    a, b = map(int, section.split("-"))
-                except ValueError:
-                    # case when user typed in only one line number e.g. file.txt[10]
-                    a = b = int(section)
-                # add the line numbers to a list of sections that should be included
-                line_numbers.append((a, b))
-        else:
-            # remember only the file name, if there are no line numbers given in the argument
-            file_name = file_descriptor
-            # list of line numbers stays empty
-        # get full file path
-        file_path = Path(file_name)
-        # create a new FileDescriptor to remember the full file path and all lines to include
-        new_file_desc = FileDescriptor(file_path, line_numbers)
-        # add the new FileDescriptor to the list of descriptions of files to parse
-        files_to_parse.append(new_file_desc)
-
-    parsed_files = _read_files(files=files_to_parse, softfail=args.softfail)
+    files_to_parse: List[FileDescriptor] = [
+        _parse_file_argument(file_argument) for file_argument in files_argument
+    ]
 
-    for parsed_file in parsed_files.items():
-        if len(parsed_file[1]["content"]) != 0:
-            break
-        else:
-            raise UserCommandError("All files were skipped, noting to create")
+    # read the files and open the connection to the Github API in the background,
+    # while the user types the password and the key derivation runs
+    session = requests.Session()
+    parsed_files_future = _run_in_background(
+        _collect_files,
+        files_to_parse,
+        args.git_diff,
+        args.softfail,
+        args.scan,
+    )
+    prewarm_future = _run_in_background(_prewarm_github_session, session)
 
     # check if user configuration file exists
     _check_user_config_existance(path=FULL_CONFIG_PATH)
@@ -270,6 +811,16 @@ def command_new(args: argparse.Namespace) -> None:
     # read user configuration
     user_configuration = _read_user_config(FULL_CONFIG_PATH)
 
+    user_name = _select_user(user_configuration, args.user)
+    # do not ask for the password if reading the files has already failed
+    if parsed_files_future.done() and parsed_files_future.exception():
+        parsed_files_future.result()
+    user_token = _unlock_api_token(user_configuration, user_name)
+
+    # join both background stages right before posting
+    parsed_files = parsed_files_future.result()
+    prewarm_future.result()
+
     # get public option either from command line argument or from user configuration file
     if not args.public:
         publish_type = (
@@ -285,86 +836,56 @@ def command_new(args: argparse.Namespace) -> None:
         public=publish_type,
     )
 
-    number_of_users = len(user_configuration["user"])
-
-    if number_of_users == 0:
-        raise UserCommandError(
-            "No github user is configured (use command 'add-user' first)",
-        )
-    elif number_of_users == 1:
-        user = user_configuration["user"][0]
-        user_name = list(user.keys())[0]
-    else:
-        # if more then one user is configured, use the one from the command line argume
-        user_name = args.user
-        if user_name == None:
-            raise UserCommandError(
-                """Found more then one user in user configuration file
-                (use '-u/--user' to select one user)""",
-            )
-        # check if username exists in user configuration file
-        for user in user_configuration["user"]:
-            if list(user.keys())[0] == user_name:
-                # found user in user configuration file
-                break
-        else:
-            raise UserCommandError(
-                f"Given user '{user_name}' does not exist in user configuration file",
-            )
-    # get user api token
-    for user in user_configuration["user"]:
-        if list(user.keys())[0] == user_name:
-            if user[user_name]["auth"] == "env":
-                # get user api token from ENV variable
-                try:
-                    user_token_raw = os.environ[f"QUICK_GIST_{user_name.upper()}_AUTH"]
-                except KeyError:
-                    raise UserCommandError(
-                        msg=f"Could not find environment variable"
-                        f"QUICK_GIST_{user_name.upper()}_AUTH",
-                    )
-            else:
-                # get user api token from user confiuration file
-                user_token_raw = user[user_name]["auth"]
-
-            # check if api token is encrypted
-            if user[user_name]["encrypted"] == True:
-                # ask for password to decrypt the user api token
-                while True:
-                    psw = getpass.getpass(prompt="Password: ")
-                    try:
-                        user_token = _password_decrypt(
-                            token=user_token_raw.encode("utf-8"),
-                            password=psw,
-                        ).decode("utf-8")
-                        # valid password, break out of loop
-                        break
-                    except UserCredentialsError:
-                        # invalid password, stay in loop and ask again
-                        pass
-            else:
-                user_token = user_token_raw
-            # found user in user configuration and break out of loop
-            break
-
     # try to post gist on github
-    gist_url = _post_github_gist(gist_content=new_gist_content, api_token=user_token)
+    try:
+        gist_url = _post_github_gist(
+            gist_content=new_gist_content,
+            api_token=user_token,
+            session=session,
+        )
+    except SystemExit:
+        _increment_counter("quick_gist_gists_failed_total", {"user": user_name})
+        raise
+    if gist_url is None:
+        _increment_counter("quick_gist_gists_failed_total", {"user": user_name})
+        raise UserCommandError("Failed to create gist")
+    _increment_counter("quick_gist_gists_created_total", {"user": user_name})
+    _increment_counter(
+        "quick_gist_uploaded_bytes_total",
+        {"user": user_name},
+        sum(len(f["content"].encode("utf-8")) for f in parsed_files.values()),
+    )
 
     # print out information about which lines files/lines did get included in the gist
     secret_public_str = "public" if args.public else "secret"
     print(f"Created new {secret_public_str} github gist!✨")
-    for file in files_to_parse:
-        if file.path.name in parsed_files.keys():
+    for file, gist_file_name in zip(files_to_parse, _gist_file_names(files_to_parse)):
+        if gist_file_name in parsed_files.keys():
             line_descriptor_str = ""
             for i, line_pair in enumerate(file.line_descriptor):
-                line_descriptor_str += f"[{line_pair[0]}-{line_pair[1]}]"
+                if isinstance(line_pair, RegexSelection):
+                    line_descriptor_str += f"[{line_pair.text}]"
+                elif isinstance(line_pair, str):
+                    line_descriptor_str += f"[{SYMBOL_SELECTOR_PREFIX}{line_pair}]"
+                else:
+                    line_descriptor_str += f"[{line_pair[0]}-{line_pair[1]}]"
                 if i < len(file.line_descriptor) - 1:
                     line_descriptor_str += ", "
+            if file.revision is not None:
+                file_path_str = f"{file.revision}:{file.path.as_posix()}"
+            elif file.archive is not None:
+                file_path_str = f"{file.archive.resolve()}::{file.path.as_posix()}"
+            else:
+                file_path_str = str(file.path.resolve())
+            if gist_file_name != file.path.name:
+                line_descriptor_str += f" as '{gist_file_name}'"
             print(
                 term_colors.GREEN,
-                f"  - {file.path.resolve()} {line_descriptor_str}",
+                f"  - {file_path_str} {line_descriptor_str}",
                 term_colors.RESET,
             )
+    if args.git_diff is not None:
+        print(term_colors.GREEN, f"  - git diff {args.git_diff}", term_colors.RESET)
     print(f"-> {gist_url}")
 
     return
@@ -421,5 +942,304 @@ def command_remove_user(args: argparse.Namespace) -> None:
         user_configuration["user"] = all_user
 
         _write_user_config(path=FULL_CONFIG_PATH, data=user_configuration)
+        _update_completion_cache(user_configuration)
     else:
         logging.info("Aboring")
+
+
+def command_completion(args: argparse.Namespace) -> None:
+    """Print the shell completion script and refresh the completion cache"""
+    if FULL_CONFIG_PATH.is_file():
+        _update_completion_cache(_read_user_config(path=FULL_CONFIG_PATH))
+    print(_completion_script(args.shell), end="")
+
+
+def command_metrics(args: argparse.Namespace) -> None:
+    """Print the cumulative metrics in the prometheus text exposition format"""
+    metrics_str = _format_metrics(_read_metrics(path=METRICS_PATH))
+    if args.output is None:
+        print(metrics_str, end="")
+        return
+
+    # the node-exporter textfile collector expects files to be replaced atomically
+    output_path = Path(args.output)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(metrics_str)
+        os.replace(tmp_path, output_path)
+    except OSError:
+        raise UserCommandError(f"Could not write metrics to '{output_path}'")
+
+
+def command_rotate_password(args: argparse.Namespace) -> None:
+    """Encrypt the API tokens of all or the selected users with a new password"""
+    # check if user configuration file exists
+    _check_user_config_existance(path=FULL_CONFIG_PATH)
+    user_configuration = _read_user_config(path=FULL_CONFIG_PATH)
+    all_users = user_configuration["user"] or []
+
+    all_user_names = [list(user.keys())[0] for user in all_users]
+    for user_name in args.user or []:
+        if user_name not in all_user_names:
+            raise UserCommandError(
+                f"Given user '{user_name}' does not exist in user configuration file",
+            )
+
+    selected_users = []
+    for user in all_users:
+        user_name = list(user.keys())[0]
+        if args.user and user_name not in args.user:
+            continue
+        if not user[user_name]["encrypted"]:
+            logging.info(f"API token of user '{user_name}' is not encrypted (skipping)")
+            continue
+        selected_users.append(user)
+    if len(selected_users) == 0:
+        raise UserCommandError("No user with an encrypted API token selected")
+
+    old_psw = getpass.getpass(prompt="Current password: ")
+    new_psw = getpass.getpass(prompt="New password: ")
+    if getpass.getpass(prompt="Repeat new password: ") != new_psw:
+        raise UserCommandError("The new passwords do not match")
+
+    selected_user_names = [list(user.keys())[0] for user in selected_users]
+    raw_tokens = [
+        _get_raw_api_token(user_name, user[user_name]).encode("utf-8")
+        for user_name, user in zip(selected_user_names, selected_users)
+    ]
+    # every token needs two expensive key derivations, run them on all cores
+    with ProcessPoolExecutor(
+        max_workers=min(len(raw_tokens), os.cpu_count() or 1),
+    ) as executor:
+        new_tokens = list(
+            executor.map(
+                _password_reencrypt,
+                raw_tokens,
+                itertools.repeat(old_psw),
+                itertools.repeat(new_psw),
+            ),
+        )
+
+    failed_user_names = [
+        user_name
+        for user_name, new_token in zip(selected_user_names, new_tokens)
+        if new_token is None
+    ]
+    if len(failed_user_names) != 0:
+        # nothing has been written yet, the configuration stays untouched
+        raise UserCommandError(
+            f"Invalid password for user(s) {', '.join(failed_user_names)} (aborting)",
+        )
+
+    env_tokens = []
+    for user_name, user, new_token in zip(
+        selected_user_names,
+        selected_users,
+        new_tokens,
+    ):
+        assert new_token is not None
+        new_token_str = new_token.decode("utf-8")
+        if user[user_name]["auth"] == "env":
+            env_tokens.append((user_name, new_token_str))
+        else:
+            user[user_name]["auth"] = new_token_str
+
+    # write down the new user configuration (atomically)
+    _write_user_config(path=FULL_CONFIG_PATH, data=user_configuration)
+    logging.info(
+        f"Successfully changed the password of user(s) {', '.join(selected_user_names)}",
+    )
+    for user_name, env_token in env_tokens:
+        print(
+            "\nPlease update your environment variable with the following name:\n"
+            f"QUICK_GIST_{user_name.upper()}_AUTH",
+        )
+        print(f"API-Token (encrypted): {env_token}")
+
+
+def command_mirror(args: argparse.Namespace) -> None:
+    """Mirror all gists of a user incrementally into a local directory"""
+    # check if user configuration file exists
+    _check_user_config_existance(path=FULL_CONFIG_PATH)
+    user_configuration = _read_user_config(FULL_CONFIG_PATH)
+    user_name = _select_user(user_configuration, args.user)
+    user_token = _unlock_api_token(user_configuration, user_name)
+
+    directory = Path(args.directory)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        raise UserCommandError(f"Could not create mirror directory '{directory}'")
+
+    # only gists that changed since the last run have to be listed and downloaded
+    state = _load_mirror_state(directory)
+    gists = _list_github_gists(api_token=user_token, since=state.get("since"))
+    result = _mirror_gists(gists, directory, state, jobs=args.jobs)
+    _save_mirror_state(directory, state)
+
+    print(
+        f"Mirrored {result.mirrored} changed gist(s) "
+        f"({result.downloaded_bytes} bytes) to {directory.resolve()}",
+    )
+    if result.failed != 0:
+        raise UserCommandError(
+            f"Failed to mirror {result.failed} gist(s) (they will be retried next run)",
+        )
+
+
+def command_prune(args: argparse.Namespace) -> None:
+    """Delete all gists of a user that match the given filters"""
+    try:
+        prune_filter = PruneFilter(
+            older_than=(
+                datetime.now(timezone.utc) - timedelta(days=args.older_than)
+                if args.older_than is not None
+                else None
+            ),
+            description_pattern=(
+                re.compile(args.description) if args.description is not None else None
+            ),
+            file_name_pattern=args.file_name,
+            public=args.public,
+        )
+    except re.error:
+        raise UserCommandError(f"Invalid description pattern '{args.description}'")
+    if prune_filter == PruneFilter():
+        raise UserCommandError("Refusing to delete all gists (use at least one filter)")
+
+    # check if user configuration file exists
+    _check_user_config_existance(path=FULL_CONFIG_PATH)
+    user_configuration = _read_user_config(FULL_CONFIG_PATH)
+    user_name = _select_user(user_configuration, args.user)
+    user_token = _unlock_api_token(user_configuration, user_name)
+
+    matching_gists = [
+        gist
+        for gist in _list_github_gists(api_token=user_token)
+        if _gist_matches(gist, prune_filter)
+    ]
+    for gist in matching_gists:
+        print(f"- {gist['html_url']} ({gist['updated_at']}) {gist['description']}")
+
+    if args.dry_run or len(matching_gists) == 0:
+        report = [_prune_report_entry(gist, "dry-run") for gist in matching_gists]
+        print(f"{len(matching_gists)} gist(s) would be deleted")
+    else:
+        if not args.yes:
+            user_confirmation_str = _get_user_input(
+                msg=f"Do you really want to delete {len(matching_gists)} gist(s) (Y/n)",
+                validation_function=lambda x: x in ["y", "Y", "n", "N"],
+            )
+            if user_confirmation_str.lower() != "y":
+                logging.info("Aboring")
+                return
+
+        status_codes = _delete_gists(
+            [gist["id"] for gist in matching_gists],
+            api_token=user_token,
+            jobs=args.jobs,
+        )
+        report = []
+        for gist in matching_gists:
+            status = status_codes[gist["id"]]
+            # a gist that is already gone does not have to be deleted anymore
+            action = "deleted" if status in (204, 404) else "failed"
+            report.append(_prune_report_entry(gist, action, status))
+        number_deleted = len([r for r in report if r["action"] == "deleted"])
+        print(f"Deleted {number_deleted} of {len(matching_gists)} gist(s)")
+
+    if args.report is not None:
+        try:
+            with open(args.report, "w") as f:
+                for entry in report:
+                    f.write(json.dumps(entry) + "\n")
+        except OSError:
+            raise UserCommandError(f"Could not write report to '{args.report}'")
+
+    if any(entry["action"] == "failed" for entry in report):
+        raise UserCommandError("Failed to delete some gists (see report)")
+
+
+def command_history(args: argparse.Namespace) -> None:
+    """List all revisions of a gist"""
+    if not re.match(HEX_PATTERN, args.gist_id):
+        raise UserCommandError(f"Invalid gist id '{args.gist_id}'")
+
+    # check if user configuration file exists
+    _check_user_config_existance(path=FULL_CONFIG_PATH)
+    user_configuration = _read_user_config(FULL_CONFIG_PATH)
+    user_name = _select_user(user_configuration, args.user)
+    user_token = _unlock_api_token(user_configuration, user_name)
+
+    commits = _list_github_gist_commits(args.gist_id, api_token=user_token)
+    stored_versions = set(_find_stored_versions(REVISION_STORE_PATH, args.gist_id, ""))
+    for commit in commits:
+        change_status = commit.get("change_status", {})
+        # mark revisions that are already in the local revision store
+        stored_str = "*" if commit["version"] in stored_versions else " "
+        print(
+            f"{stored_str} {commit['version'][:8]} {commit['committed_at']} "
+            f"(+{change_status.get('additions', 0)} "
+            f"-{change_status.get('deletions', 0)})",
+        )
+
+
+def command_diff(args: argparse.Namespace) -> None:
+    """Show the differences between two revisions of a gist"""
+    for value in (args.gist_id, args.revision_a, args.revision_b):
+        if not re.match(HEX_PATTERN, value):
+            raise UserCommandError(f"Invalid gist id or revision '{value}'")
+
+    # the api token (and the password) is only needed if something must be downloaded
+    user_token: Optional[str] = None
+
+    def get_user_token() -> str:
+        nonlocal user_token
+        if user_token is None:
+            _check_user_config_existance(path=FULL_CONFIG_PATH)
+            user_configuration = _read_user_config(FULL_CONFIG_PATH)
+            user_name = _select_user(user_configuration, args.user)
+            user_token = _unlock_api_token(user_configuration, user_name)
+        return user_token
+
+    # resolve (abbreviated) revisions, from the local revision store if possible
+    commits: Optional[List[dict]] = None
+    versions = []
+    for revision in (args.revision_a, args.revision_b):
+        matching_versions = _find_stored_versions(
+            REVISION_STORE_PATH,
+            args.gist_id,
+            revision,
+        )
+        if len(matching_versions) != 1:
+            if commits is None:
+                commits = _list_github_gist_commits(
+                    args.gist_id,
+                    api_token=get_user_token(),
+                )
+            matching_versions = [
+                commit["version"]
+                for commit in commits
+                if commit["version"].startswith(revision)
+            ]
+        if len(matching_versions) == 0:
+            raise UserCommandError(f"Revision '{revision}' does not exist")
+        elif len(matching_versions) > 1:
+            raise UserCommandError(f"Revision '{revision}' is ambiguous")
+        versions.append(matching_versions[0])
+
+    # revisions are immutable, every revision is downloaded only once
+    all_files = []
+    for version in versions:
+        files = _load_revision(REVISION_STORE_PATH, args.gist_id, version)
+        if files is None:
+            files = _fetch_revision(
+                REVISION_STORE_PATH,
+                args.gist_id,
+                version,
+                api_token=get_user_token(),
+            )
+        all_files.append(files)
+
+    print(_diff_revisions(all_files[0], all_files[1], versions[0], versions[1]), end="")
@@ -0,0 +1,144 @@
+"""
+Lightweight shell completion for quick-gist
+
+This module is imported by the 'quick-gist-complete' entry point on every
+tab press and therefore must only depend on the standard library.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+COMPLETION_CACHE_PATH = Path(
+    str(os.getenv("HOME")) + "/.config/quick-gist/completion-cache",
+)
+
+COMPLETION_SHELLS = ("bash", "zsh", "fish")
+# same as quick_gist.scan.SCAN_POLICIES, not imported to keep tab presses fast
+SCAN_POLICIES = ("redact", "abort")
+COMMANDS = [
+    "add-user",
+    "remove-user",
+    "list-user",
+    "new",
+    "completion",
+    "metrics",
+    "rotate-password",
+    "mirror",
+    "prune",
+    "history",
+    "diff",
+]
+NEW_OPTIONS = [
+    "-f",
+    "--files",
+    "-d",
+    "--description",
+    "-p",
+    "--public",
+    "-sf",
+    "--softfail",
+    "-u",
+    "--user",
+    "-s",
+    "--scan",
+    "--git-diff",
+]
+
+BASH_COMPLETION_SCRIPT = """\
+_quick_gist() {
+    local IFS=$'\\n'
+    COMPREPLY=($(quick-gist-complete "${COMP_WORDS[@]:1:COMP_CWORD}"))
+}
+complete -o default -F _quick_gist quick-gist
+"""
+
+ZSH_COMPLETION_SCRIPT = """\
+#compdef quick-gist
+_quick_gist() {
+    local -a candidates
+    candidates=("${(@f)$(quick-gist-complete "${(@)words[2,CURRENT]}")}")
+    if [[ -n "${candidates[1]}" ]]; then
+        compadd -a candidates
+    else
+        _files
+    fi
+}
+compdef _quick_gist quick-gist
+"""
+
+FISH_COMPLETION_SCRIPT = """\
+complete -c quick-gist -a '(quick-gist-complete (commandline -opc)[2..-1] (commandline -ct))'
+"""
+
+
+def _read_completion_cache(path: Path = COMPLETION_CACHE_PATH) -> List[str]:
+    """Read the cached list of configured user names"""
+    try:
+        with open(path, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def _write_completion_cache(
+    user_names: List[str],
+    path: Path = COMPLETION_CACHE_PATH,
+) -> None:
+    """Write the list of configured user names to the completion cache"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write("".join(f"{user_name}\n" for user_name in user_names))
+    os.replace(tmp_path, path)
+
+
+def _completion_script(shell: str) -> str:
+    """Return the completion script for the given shell"""
+    scripts = {
+        "bash": BASH_COMPLETION_SCRIPT,
+        "zsh": ZSH_COMPLETION_SCRIPT,
+        "fish": FISH_COMPLETION_SCRIPT,
+    }
+    return scripts[shell]
+
+
+def _complete(words: List[str], path: Path = COMPLETION_CACHE_PATH) -> List[str]:
+    """
+    Return all completion candidates for the given command line words
+    (without the program name, the last word is the one being completed)
+    """
+    if len(words) == 0:
+        words = [""]
+    current = words[-1]
+    previous = words[-2] if len(words) > 1 else None
+
+    if previous is None:
+        candidates = COMMANDS
+    elif previous in ("-u", "--user"):
+        candidates = _read_completion_cache(path=path)
+    elif previous in ("-s", "--scan"):
+        candidates = list(SCAN_POLICIES)
+    elif words[0] == "completion" and len(words) == 2:
+        candidates = list(COMPLETION_SHELLS)
+    elif words[0] == "new" and current.startswith("-"):
+        candidates = NEW_OPTIONS
+    else:
+        # fall back to the shells default (file) completion
+        candidates = []
+
+    return [c for c in candidates if c.startswith(current)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    words = list(sys.argv[1:] if argv is None else argv)
+    for candidate in _complete(words):
+        print(candidate)
+    return 0
+
+
+if __name__ == "__main__":
+
+    exit(main())
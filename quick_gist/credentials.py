@@ -4,6 +4,7 @@ import pathlib
 import secrets
 from base64 import urlsafe_b64decode as b64d
 from base64 import urlsafe_b64encode as b64e
+from typing import Optional
 from typing import Union
 
 import yaml
@@ -78,6 +79,23 @@ def _password_decrypt(token: bytes, password: str) -> bytes:
     return token
 
 
+def _password_reencrypt(
+    token: bytes,
+    old_password: str,
+    new_password: str,
+) -> Optional[bytes]:
+    """
+    Decrypt a message with the old password and encrypt it with the new one
+    (returns None if the old password is invalid)
+    """
+    try:
+        message = _password_decrypt(token=token, password=old_password)
+    except UserCredentialsError:
+        return None
+
+    return _password_encrypt(message=message, password=new_password)
+
+
 def _check_user_config_existance(path: pathlib.Path) -> None:
     """Check if a user configuration file exists and report status"""
     if not path.is_file():
@@ -121,5 +139,25 @@ def _read_user_config(path: pathlib.Path) -> dict:
 
 def _write_user_config(path: pathlib.Path, data: dict) -> None:
     """Write confiiguration in user configuration file"""
-    with open(path, "w") as f:
+    # write to a temporary file first and replace the configuration atomically,
+    # so a crash can never leave a partially written configuration behind
+    tmp_path = path.with_name(path.name + ".tmp")
+    # the configuration may contain plain API tokens, keep the permissions of an
+    # existing configuration and never make a new one readable for other users
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o600
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w") as f:
+        os.fchmod(f.fileno(), mode)
         yaml.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # persist the rename itself
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,79 @@
+import logging
+import subprocess
+from typing import Optional
+
+
+class GitError(Exception):
+    def __init__(self, msg=""):
+        logging.error(f"GitError: {msg}")
+        exit(1)
+
+
+class GitCatFile:
+    """
+    Persistent 'git cat-file --batch' process, so that any number
+    of blobs can be read with a single git process
+    """
+
+    def __init__(self, cwd: Optional[str] = None):
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=cwd,
+        )
+
+    def read(self, object_name: str) -> bytes:
+        """Read the content of a blob given as '<revision>:<path>'"""
+        stdin, stdout = self._process.stdin, self._process.stdout
+        assert stdin is not None and stdout is not None
+        stdin.write(object_name.encode("utf-8") + b"\n")
+        stdin.flush()
+
+        header = stdout.readline()
+        if not header:
+            raise OSError("git cat-file terminated unexpectedly")
+        if header.rstrip().endswith((b" missing", b" ambiguous")):
+            raise FileNotFoundError(f"Git object '{object_name}' does not exist")
+
+        _, object_type, size = header.split()
+        content = stdout.read(int(size))
+        # every object is followed by a single line feed
+        stdout.read(1)
+        if object_type != b"blob":
+            raise IsADirectoryError(
+                f"Git object '{object_name}' is a {object_type.decode()}, not a file",
+            )
+
+        return content
+
+    def close(self) -> None:
+        """Terminate the cat-file process"""
+        if self._process.stdin is not None:
+            self._process.stdin.close()
+        self._process.wait()
+
+    def __enter__(self) -> "GitCatFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _read_git_diff(revision_range: str, cwd: Optional[str] = None) -> str:
+    """Return the output of 'git diff' for a given revision range e.g. 'A..B'"""
+    try:
+        ret = subprocess.run(
+            ["git", "diff", "--no-color", revision_range, "--"],
+            capture_output=True,
+            cwd=cwd,
+        )
+    except OSError:
+        raise GitError("Failed to run git (is git installed?)")
+    if ret.returncode != 0:
+        raise GitError(
+            f"Failed to create diff for '{revision_range}': "
+            f"{ret.stderr.decode('utf-8', errors='replace').strip()}",
+        )
+
+    return ret.stdout.decode("utf-8", errors="replace")
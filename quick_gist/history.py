@@ -0,0 +1,129 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from quick_gist.api import _get_github_gist_revision
+from quick_gist.api import _get_github_raw_content
+
+REVISION_STORE_PATH = Path(str(os.getenv("HOME")) + "/.cache/quick-gist/revisions/")
+
+# gist ids and revision versions are hex strings (also used as path names)
+HEX_PATTERN = re.compile(r"^[0-9a-fA-F]+$")
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write a file atomically"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _blob_path(store: Path, digest: str) -> Path:
+    return store / "objects" / digest[:2] / digest[2:]
+
+
+def _store_blob(store: Path, content: bytes) -> str:
+    """Store file content by its hash (only once) and return the hash"""
+    digest = hashlib.sha256(content).hexdigest()
+    path = _blob_path(store, digest)
+    if not path.exists():
+        _write_atomic(path, content)
+
+    return digest
+
+
+def _save_revision(
+    store: Path,
+    gist_id: str,
+    version: str,
+    files: Dict[str, bytes],
+) -> None:
+    """Save all files of a gist revision in the revision store"""
+    manifest = {name: _store_blob(store, content) for name, content in files.items()}
+    _write_atomic(
+        store / gist_id / f"{version}.json",
+        json.dumps(manifest, indent=2).encode("utf-8"),
+    )
+
+
+def _load_revision(
+    store: Path,
+    gist_id: str,
+    version: str,
+) -> Optional[Dict[str, bytes]]:
+    """Load all files of a gist revision from the revision store (if it is stored)"""
+    try:
+        with open(store / gist_id / f"{version}.json", "r") as f:
+            manifest = json.load(f)
+        files = {}
+        for name, digest in manifest.items():
+            with open(_blob_path(store, digest), "rb") as f:
+                files[name] = f.read()
+    except (OSError, ValueError):
+        return None
+
+    return files
+
+
+def _find_stored_versions(store: Path, gist_id: str, prefix: str) -> List[str]:
+    """Find all stored revisions of a gist starting with the given prefix"""
+    try:
+        return sorted(
+            path.stem
+            for path in (store / gist_id).glob("*.json")
+            if path.stem.startswith(prefix)
+        )
+    except OSError:
+        return []
+
+
+def _fetch_revision(
+    store: Path,
+    gist_id: str,
+    version: str,
+    api_token: str,
+) -> Dict[str, bytes]:
+    """Download a gist revision and save it in the revision store"""
+    gist = _get_github_gist_revision(gist_id, version, api_token)
+    files = {}
+    for name, file in gist["files"].items():
+        if file.get("truncated") or file.get("content") is None:
+            files[name] = _get_github_raw_content(file["raw_url"])
+        else:
+            files[name] = file["content"].encode("utf-8")
+    _save_revision(store, gist_id, version, files)
+
+    return files
+
+
+def _diff_revisions(
+    files_a: Dict[str, bytes],
+    files_b: Dict[str, bytes],
+    version_a: str,
+    version_b: str,
+) -> str:
+    """Create a unified diff of all files of two gist revisions"""
+    diff_lines: List[str] = []
+    for name in sorted(set(files_a) | set(files_b)):
+        lines_a = files_a.get(name, b"").decode("utf-8", errors="replace")
+        lines_b = files_b.get(name, b"").decode("utf-8", errors="replace")
+        for line in difflib.unified_diff(
+            lines_a.splitlines(keepends=True),
+            lines_b.splitlines(keepends=True),
+            fromfile=f"{version_a[:8]}/{name}" if name in files_a else "/dev/null",
+            tofile=f"{version_b[:8]}/{name}" if name in files_b else "/dev/null",
+        ):
+            # keep the diff readable if a file does not end with a new line
+            if not line.endswith("\n"):
+                line += "\n\\ No newline at end of file\n"
+            diff_lines.append(line)
+
+    return "".join(diff_lines)
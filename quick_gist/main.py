@@ -4,9 +4,29 @@ from typing import Optional
 from typing import Sequence
 
 from quick_gist.commands import command_add_user
+from quick_gist.commands import command_completion
+from quick_gist.commands import command_diff
+from quick_gist.commands import command_history
 from quick_gist.commands import command_list_user
+from quick_gist.commands import command_metrics
+from quick_gist.commands import command_mirror
 from quick_gist.commands import command_new
+from quick_gist.commands import command_prune
 from quick_gist.commands import command_remove_user
+from quick_gist.commands import command_rotate_password
+from quick_gist.completion import COMPLETION_SHELLS
+from quick_gist.scan import SCAN_POLICIES
+
+
+def _positive_int(value: str) -> int:
+    """Argument type for numbers that have to be greater than zero"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: '{value}'")
+    return number
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:
@@ -51,8 +71,15 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         "--files",
         type=str,
         nargs="+",
-        help="Files to include into the gist",
-        required=True,
+        help="Files to include into the gist (also '<revision>:<path>' from git)",
+        required=False,
+    )
+
+    parser_new.add_argument(
+        "--git-diff",
+        type=str,
+        help="Include the git diff of a revision range e.g. 'A..B' into the gist",
+        required=False,
     )
 
     parser_new.add_argument(
@@ -88,6 +115,207 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         required=False,
     )
 
+    parser_new.add_argument(
+        "-s",
+        "--scan",
+        type=str,
+        choices=SCAN_POLICIES,
+        help="Scan the files for secrets (e.g. API tokens) and redact them or abort",
+        required=False,
+    )
+
+    # subparser to print a shell completion script
+    parser_completion = subparser.add_parser(
+        "completion",
+        help="Print the shell completion script for bash, zsh or fish",
+    )
+
+    parser_completion.add_argument(
+        "shell",
+        type=str,
+        choices=COMPLETION_SHELLS,
+        help="Shell to create the completion script for",
+    )
+
+    # subparser to print cumulative metrics
+    parser_metrics = subparser.add_parser(
+        "metrics",
+        help="Print cumulative metrics in the prometheus text format",
+    )
+
+    parser_metrics.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Write the metrics atomically to a file (e.g. for node-exporter)",
+        required=False,
+    )
+
+    # subparser to change the encryption password of api tokens
+    parser_rotatepassword = subparser.add_parser(
+        "rotate-password",
+        help="Change the password of encrypted API tokens",
+    )
+
+    parser_rotatepassword.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        nargs="+",
+        help="Github usernames (default: all users with an encrypted API token)",
+        required=False,
+    )
+
+    # subparser to mirror all gists into a local directory
+    parser_mirror = subparser.add_parser(
+        "mirror",
+        help="Mirror all gists incrementally into a local directory",
+    )
+
+    parser_mirror.add_argument(
+        "directory",
+        type=str,
+        help="Directory to mirror the gists into",
+    )
+
+    parser_mirror.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        help="Github username",
+        required=False,
+    )
+
+    parser_mirror.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        help="Number of parallel downloads",
+        default=8,
+        required=False,
+    )
+
+    # subparser to delete gists matching some filters
+    parser_prune = subparser.add_parser(
+        "prune",
+        help="Delete all gists matching the given filters",
+    )
+
+    parser_prune.add_argument(
+        "--older-than",
+        type=int,
+        help="Only gists that were not updated for the given number of days",
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "--description",
+        type=str,
+        help="Only gists with a description matching the given regex",
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "--file-name",
+        type=str,
+        help="Only gists with a file name matching the given pattern (e.g. '*.log')",
+        required=False,
+    )
+
+    parser_prune_visibility = parser_prune.add_mutually_exclusive_group()
+
+    parser_prune_visibility.add_argument(
+        "--public",
+        dest="public",
+        action="store_const",
+        const=True,
+        help="Only public gists",
+    )
+
+    parser_prune_visibility.add_argument(
+        "--secret",
+        dest="public",
+        action="store_const",
+        const=False,
+        help="Only secret gists",
+    )
+
+    parser_prune.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="Only show which gists would be deleted",
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="Do not ask for confirmation",
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        help="Number of concurrent delete requests",
+        default=4,
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "--report",
+        type=str,
+        help="Write a NDJSON report of all matching gists to a file",
+        required=False,
+    )
+
+    parser_prune.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        help="Github username",
+        required=False,
+    )
+
+    # subparser to list the revisions of a gist
+    parser_history = subparser.add_parser(
+        "history",
+        help="List all revisions of a gist",
+    )
+
+    parser_history.add_argument("gist_id", type=str, help="Id of the gist")
+
+    parser_history.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        help="Github username",
+        required=False,
+    )
+
+    # subparser to show the differences between two revisions of a gist
+    parser_diff = subparser.add_parser(
+        "diff",
+        help="Show the differences between two revisions of a gist",
+    )
+
+    parser_diff.add_argument("gist_id", type=str, help="Id of the gist")
+
+    parser_diff.add_argument("revision_a", type=str, help="First revision")
+
+    parser_diff.add_argument("revision_b", type=str, help="Second revision")
+
+    parser_diff.add_argument(
+        "-u",
+        "--user",
+        type=str,
+        help="Github username",
+        required=False,
+    )
+
     # parse arguments
     args = parser.parse_args(argv)
 
@@ -103,6 +331,20 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         command_list_user(args=args)
     elif args.command == "new":
         command_new(args=args)
+    elif args.command == "completion":
+        command_completion(args=args)
+    elif args.command == "metrics":
+        command_metrics(args=args)
+    elif args.command == "rotate-password":
+        command_rotate_password(args=args)
+    elif args.command == "mirror":
+        command_mirror(args=args)
+    elif args.command == "prune":
+        command_prune(args=args)
+    elif args.command == "history":
+        command_history(args=args)
+    elif args.command == "diff":
+        command_diff(args=args)
     return 0
 
 
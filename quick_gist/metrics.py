@@ -0,0 +1,167 @@
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import NamedTuple
+
+METRICS_PATH = Path(str(os.getenv("HOME")) + "/.config/quick-gist/metrics.json")
+
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricDescriptor(NamedTuple):
+    type: str
+    help: str
+
+
+METRICS = {
+    "quick_gist_gists_created_total": MetricDescriptor(
+        "counter",
+        "Number of successfully created gists",
+    ),
+    "quick_gist_gists_failed_total": MetricDescriptor(
+        "counter",
+        "Number of gists that could not be created",
+    ),
+    "quick_gist_uploaded_bytes_total": MetricDescriptor(
+        "counter",
+        "Number of bytes of file content uploaded to gists",
+    ),
+    "quick_gist_api_request_duration_seconds": MetricDescriptor(
+        "histogram",
+        "Duration of Github API requests",
+    ),
+    "quick_gist_rate_limit_remaining": MetricDescriptor(
+        "gauge",
+        "Remaining Github API requests reported by the last response",
+    ),
+    "quick_gist_kdf_unlock_duration_seconds": MetricDescriptor(
+        "histogram",
+        "Duration of the password key derivation to unlock an API token",
+    ),
+}
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Format labels in the prometheus text format e.g. 'user="alice"'"""
+    escaped_labels = []
+    for name, value in sorted(labels.items()):
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped_labels.append(f'{name}="{value}"')
+    return ",".join(escaped_labels)
+
+
+def _update_metrics(update: Callable[[dict], None], path: Path = METRICS_PATH) -> None:
+    """
+    Apply an update to the metrics store while holding a lock, so that
+    concurrent quick-gist invocations do not lose updates
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_name(path.name + ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(path, "r") as f:
+                    store = json.load(f)
+            except (OSError, ValueError):
+                store = {}
+            update(store)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(store, f)
+            os.replace(tmp_path, path)
+    except OSError:
+        # metrics must never break the actual command
+        logging.debug(f"Could not update metrics store at {path}")
+
+
+def _increment_counter(
+    name: str,
+    labels: Dict[str, str],
+    value: float = 1,
+    path: Path = METRICS_PATH,
+) -> None:
+    """Increment a cumulative counter"""
+
+    def update(store: dict) -> None:
+        series = store.setdefault(name, {})
+        label_str = _format_labels(labels)
+        series[label_str] = series.get(label_str, 0) + value
+
+    _update_metrics(update, path=path)
+
+
+def _set_gauge(
+    name: str,
+    labels: Dict[str, str],
+    value: float,
+    path: Path = METRICS_PATH,
+) -> None:
+    """Set a gauge to the given value"""
+
+    def update(store: dict) -> None:
+        store.setdefault(name, {})[_format_labels(labels)] = value
+
+    _update_metrics(update, path=path)
+
+
+def _observe_histogram(
+    name: str,
+    labels: Dict[str, str],
+    value: float,
+    path: Path = METRICS_PATH,
+) -> None:
+    """Add an observation to a histogram"""
+
+    def update(store: dict) -> None:
+        series = store.setdefault(name, {})
+        histogram = series.setdefault(
+            _format_labels(labels),
+            {"buckets": [0] * len(HISTOGRAM_BUCKETS), "sum": 0, "count": 0},
+        )
+        for i, bucket in enumerate(HISTOGRAM_BUCKETS):
+            if value <= bucket:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    _update_metrics(update, path=path)
+
+
+def _read_metrics(path: Path = METRICS_PATH) -> dict:
+    """Read the metrics store"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _join_labels(*label_strs: str) -> str:
+    """Join formatted labels and wrap them in braces"""
+    joined = ",".join(label_str for label_str in label_strs if label_str)
+    return f"{{{joined}}}" if joined else ""
+
+
+def _format_metrics(store: dict) -> str:
+    """Format the metrics store in the prometheus text exposition format"""
+    lines = []
+    for name, descriptor in METRICS.items():
+        lines.append(f"# HELP {name} {descriptor.help}")
+        lines.append(f"# TYPE {name} {descriptor.type}")
+        for label_str, value in sorted(store.get(name, {}).items()):
+            if descriptor.type != "histogram":
+                lines.append(f"{name}{_join_labels(label_str)} {value}")
+                continue
+            for bucket, bucket_count in zip(HISTOGRAM_BUCKETS, value["buckets"]):
+                bucket_labels = _join_labels(label_str, f'le="{bucket}"')
+                lines.append(f"{name}_bucket{bucket_labels} {bucket_count}")
+            inf_labels = _join_labels(label_str, 'le="+Inf"')
+            lines.append(f"{name}_bucket{inf_labels} {value['count']}")
+            lines.append(f"{name}_sum{_join_labels(label_str)} {value['sum']}")
+            lines.append(f"{name}_count{_join_labels(label_str)} {value['count']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import pathlib
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Set
+
+import requests
+
+from quick_gist.api import _download_github_raw_file
+
+MIRROR_STATE_NAME = ".quick-gist-mirror.json"
+MIRROR_METADATA_NAME = ".gist.json"
+
+
+class MirrorResult(NamedTuple):
+    mirrored: int
+    failed: int
+    downloaded_bytes: int
+
+
+def _load_mirror_state(directory: pathlib.Path) -> dict:
+    """Load the state of the last mirror run from the mirror directory"""
+    try:
+        with open(directory / MIRROR_STATE_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"since": None, "gists": {}}
+
+
+def _save_mirror_state(directory: pathlib.Path, state: dict) -> None:
+    """Save the state of the mirror run atomically"""
+    state_path = directory / MIRROR_STATE_NAME
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _is_safe_file_name(file_name: str) -> bool:
+    """Check that a gist file name can not escape its gist directory"""
+    return (
+        file_name not in ("", ".", "..", MIRROR_METADATA_NAME)
+        and "/" not in file_name
+        and "\0" not in file_name
+    )
+
+
+def _prepare_gist_directory(directory: pathlib.Path, gist: dict) -> None:
+    """Create the directory of a gist, write its metadata and remove deleted files"""
+    gist_directory = directory / gist["id"]
+    gist_directory.mkdir(parents=True, exist_ok=True)
+    for path in gist_directory.iterdir():
+        if path.name != MIRROR_METADATA_NAME and path.name not in gist["files"]:
+            path.unlink()
+
+    metadata = {
+        "id": gist["id"],
+        "description": gist.get("description"),
+        "public": gist.get("public"),
+        "html_url": gist.get("html_url"),
+        "created_at": gist.get("created_at"),
+        "updated_at": gist["updated_at"],
+    }
+    with open(gist_directory / MIRROR_METADATA_NAME, "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def _mirror_gists(
+    gists: List[dict],
+    directory: pathlib.Path,
+    state: dict,
+    jobs: int = 8,
+) -> MirrorResult:
+    """
+    Download all gists that changed since the last run into the mirror
+    directory and update the mirror state
+    """
+    mirrored_gists: Dict[str, str] = state.setdefault("gists", {})
+    changed_gists = [
+        gist for gist in gists if mirrored_gists.get(gist["id"]) != gist["updated_at"]
+    ]
+
+    failed_gist_ids: Set[str] = set()
+    downloaded_bytes = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for gist in changed_gists:
+            _prepare_gist_directory(directory, gist)
+            for file_name, file in gist["files"].items():
+                if not _is_safe_file_name(file_name):
+                    logging.warning(
+                        f"Skipping file '{file_name}' of gist {gist['id']} (invalid name)",
+                    )
+                    continue
+                future = executor.submit(
+                    _download_github_raw_file,
+                    file["raw_url"],
+                    directory / gist["id"] / file_name,
+                )
+                futures[future] = (gist["id"], file_name)
+
+        for future in as_completed(futures):
+            gist_id, file_name = futures[future]
+            try:
+                downloaded_bytes += future.result()
+            except (requests.exceptions.RequestException, OSError):
+                logging.warning(
+                    f"Failed to download file '{file_name}' of gist {gist_id}",
+                )
+                failed_gist_ids.add(gist_id)
+
+    for gist in changed_gists:
+        if gist["id"] not in failed_gist_ids:
+            mirrored_gists[gist["id"]] = gist["updated_at"]
+
+    # only move the 'since' marker forward if nothing has to be retried
+    if len(failed_gist_ids) == 0 and len(gists) != 0:
+        latest_update = max(gist["updated_at"] for gist in gists)
+        state["since"] = max(latest_update, state.get("since") or latest_update)
+
+    return MirrorResult(
+        mirrored=len(changed_gists) - len(failed_gist_ids),
+        failed=len(failed_gist_ids),
+        downloaded_bytes=downloaded_bytes,
+    )
@@ -0,0 +1,120 @@
+import fnmatch
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timezone
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Pattern
+
+import requests
+
+from quick_gist.api import _delete_github_gist
+from quick_gist.api import _rate_limit_wait_time
+
+GITHUB_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+MAX_DELETE_ATTEMPTS = 5
+
+
+class PruneFilter(NamedTuple):
+    older_than: Optional[datetime] = None
+    description_pattern: Optional[Pattern] = None
+    file_name_pattern: Optional[str] = None
+    public: Optional[bool] = None
+
+
+def _parse_github_time(time_str: str) -> datetime:
+    """Parse a timestamp of the Github API"""
+    return datetime.strptime(time_str, GITHUB_TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def _gist_matches(gist: dict, prune_filter: PruneFilter) -> bool:
+    """Check if a gist matches all given filters"""
+    if prune_filter.older_than is not None:
+        if _parse_github_time(gist["updated_at"]) >= prune_filter.older_than:
+            return False
+    if prune_filter.description_pattern is not None:
+        if not prune_filter.description_pattern.search(gist.get("description") or ""):
+            return False
+    if prune_filter.file_name_pattern is not None:
+        if not any(
+            fnmatch.fnmatch(file_name, prune_filter.file_name_pattern)
+            for file_name in gist["files"]
+        ):
+            return False
+    if prune_filter.public is not None:
+        if gist["public"] != prune_filter.public:
+            return False
+
+    return True
+
+
+class _RateLimitPause:
+    """Pause shared by all workers, so one exceeded rate limit stops every worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            pause_until = self._pause_until
+        delay = pause_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.time() + seconds)
+
+
+def _delete_gist_with_retry(
+    gist_id: str,
+    api_token: str,
+    rate_limit_pause: _RateLimitPause,
+) -> int:
+    """Delete a gist, waiting and retrying on rate limits, and return the status code"""
+    for _ in range(MAX_DELETE_ATTEMPTS):
+        rate_limit_pause.wait()
+        res = _delete_github_gist(gist_id, api_token)
+        wait_time = _rate_limit_wait_time(res)
+        if wait_time is None:
+            return res.status_code
+        logging.warning(f"Rate limit exceeded, waiting {wait_time:.0f}s")
+        rate_limit_pause.pause(wait_time)
+
+    return res.status_code
+
+
+def _delete_gists(gist_ids: List[str], api_token: str, jobs: int = 4) -> Dict[str, int]:
+    """Delete gists with a bounded number of concurrent requests"""
+    rate_limit_pause = _RateLimitPause()
+
+    def delete(gist_id: str) -> int:
+        try:
+            return _delete_gist_with_retry(gist_id, api_token, rate_limit_pause)
+        except requests.exceptions.RequestException:
+            logging.warning(f"Failed to delete gist {gist_id} (connection error)")
+            return 0
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(zip(gist_ids, executor.map(delete, gist_ids)))
+
+
+def _prune_report_entry(gist: dict, action: str, status: Optional[int] = None) -> dict:
+    """Create one entry of the NDJSON prune report"""
+    return {
+        "id": gist["id"],
+        "action": action,
+        "status": status,
+        "description": gist.get("description"),
+        "public": gist["public"],
+        "files": list(gist["files"].keys()),
+        "created_at": gist.get("created_at"),
+        "updated_at": gist["updated_at"],
+        "html_url": gist.get("html_url"),
+    }
@@ -0,0 +1,133 @@
+import logging
+import re
+from collections import OrderedDict
+from typing import List
+from typing import Match
+from typing import NamedTuple
+from typing import Optional
+from typing import Pattern
+from typing import Tuple
+
+SCAN_POLICIES = ("redact", "abort")
+REDACTED_TEMPLATE = "[REDACTED:{rule}]"
+
+
+class SecretRule(NamedTuple):
+    name: str
+    # patterns have to start with a literal character (used to skip ahead quickly)
+    pattern: str
+    # the secret has to start at a word boundary
+    boundary: bool = True
+
+
+class SecretFinding(NamedTuple):
+    file_name: str
+    rule: str
+    line: int
+
+
+class SecretScanError(Exception):
+    def __init__(self, msg=""):
+        logging.error(f"SecretScanError: {msg}")
+        exit(1)
+
+
+# rule names are used as regex group names and must be valid identifiers
+SECRET_RULES = [
+    SecretRule("github_token", r"gh[pousr]_[A-Za-z0-9]{36,255}\b"),
+    SecretRule("github_fine_grained_token", r"github_pat_[A-Za-z0-9_]{82}\b"),
+    SecretRule("aws_access_key_id", r"A(?:KIA|SIA)[0-9A-Z]{16}\b"),
+    SecretRule("google_api_key", r"AIza[0-9A-Za-z\-_]{35}\b"),
+    SecretRule("slack_token", r"xox[abposr]-[0-9A-Za-z\-]{10,}"),
+    # only the header is matched, the block is redacted up to its end marker
+    SecretRule(
+        "private_key",
+        r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY-----",
+        boundary=False,
+    ),
+]
+# a lookbehind is much cheaper than starting every rule with \b
+WORD_START = r"(?<!\w)"
+PRIVATE_KEY_END_PATTERN = re.compile(r"-----END (?:[A-Z0-9]+ )*PRIVATE KEY-----")
+
+
+def _compile_secret_rules(rules: List[SecretRule]) -> Pattern:
+    """
+    Combine all rules into one alternation so content is scanned in a single pass,
+    positions that can not start any rule are skipped with a single lookahead
+    """
+    first_characters = "".join(sorted({re.escape(rule.pattern[0]) for rule in rules}))
+    branches = [
+        f"(?P<{rule.name}>{WORD_START if rule.boundary else ''}{rule.pattern})"
+        for rule in rules
+    ]
+    return re.compile(f"(?=[{first_characters}])(?:{'|'.join(branches)})")
+
+
+SECRET_PATTERN = _compile_secret_rules(SECRET_RULES)
+
+
+def _scan_content(
+    content: str,
+    pattern: Pattern = SECRET_PATTERN,
+) -> Tuple[str, List[Tuple[str, int]]]:
+    """
+    Scan content for secrets and return the redacted content
+    together with the (rule, line number) of every finding
+    """
+    findings: List[Tuple[str, int]] = []
+    redacted_parts: List[str] = []
+    position = 0
+    line_number = 1
+    # the next end marker of a private key, searched again only once it is passed
+    key_end: Optional[Match] = None
+    key_end_searched = False
+    for m in pattern.finditer(content):
+        if m.start() < position:
+            # inside of an already redacted private key block
+            continue
+        rule = m.lastgroup or "unknown"
+        end = m.end()
+        if rule == "private_key":
+            if not key_end_searched or (key_end is not None and key_end.start() < end):
+                key_end = PRIVATE_KEY_END_PATTERN.search(content, end)
+                key_end_searched = True
+            if key_end is not None:
+                end = key_end.end()
+        # count lines incrementally instead of rescanning from the start
+        line_number += content.count("\n", position, m.start())
+        findings.append((rule, line_number))
+        redacted_parts.append(content[position : m.start()])
+        redacted_parts.append(REDACTED_TEMPLATE.format(rule=rule))
+        line_number += content.count("\n", m.start(), end)
+        position = end
+
+    if len(findings) == 0:
+        return content, findings
+
+    redacted_parts.append(content[position:])
+    return "".join(redacted_parts), findings
+
+
+def _scan_files(files: dict, policy: str) -> dict:
+    """Scan read in files for secrets and redact them or abort depending on the policy"""
+    if policy not in SCAN_POLICIES:
+        raise SecretScanError(f"Unknown scan policy '{policy}'")
+
+    scanned_files = OrderedDict()
+    all_findings: List[SecretFinding] = []
+    for file_name, file_descriptor in files.items():
+        content, findings = _scan_content(file_descriptor["content"])
+        for rule, line in findings:
+            all_findings.append(SecretFinding(file_name, rule, line))
+            logging.warning(
+                f"Possible secret ({rule}) found in '{file_name}' at line {line}",
+            )
+        scanned_files[file_name] = {"content": content}
+
+    if len(all_findings) != 0 and policy == "abort":
+        raise SecretScanError(
+            f"Found {len(all_findings)} possible secret(s), nothing was uploaded",
+        )
+
+    return scanned_files
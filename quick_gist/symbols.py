@@ -0,0 +1,153 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+SYMBOL_CACHE_PATH = Path(str(os.getenv("HOME")) + "/.cache/quick-gist/symbols/")
+# bump this whenever the index format or the parsing rules change
+SYMBOL_INDEX_VERSION = 1
+
+PYTHON_SUFFIXES = (".py", ".pyi", ".pyw")
+
+DEFINITION_PATTERN = re.compile(
+    r"^(?P<indent>[ \t]*)"
+    r"(?:(?:export|public|private|protected|internal|static|async|pub|default|"
+    r"abstract|final|override|inline|local)\s+)*"
+    r"(?:def|class|function|func|fn|struct|interface|enum|trait|module|sub|proc)"
+    r"\s+(?P<name>[A-Za-z_$][\w$]*)",
+)
+
+
+def _python_symbol_index(source: str) -> Dict[str, Tuple[int, int]]:
+    """Build a symbol index of all classes and functions in python source code"""
+    index: Dict[str, Tuple[int, int]] = {}
+
+    def visit(nodes: List[ast.stmt], prefix: str) -> None:
+        for node in nodes:
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = prefix + node.name
+                # decorators belong to the definition
+                first_line = min(
+                    [node.lineno] + [d.lineno for d in node.decorator_list],
+                )
+                # keep the first definition if a name is defined more than once
+                index.setdefault(name, (first_line, node.end_lineno))  # type: ignore
+                visit(node.body, f"{name}.")
+            else:
+                # definitions inside of if/try/with/... blocks keep their prefix
+                visit(
+                    [c for c in ast.iter_child_nodes(node) if isinstance(c, ast.stmt)],
+                    prefix,
+                )
+
+    visit(ast.parse(source).body, "")
+
+    return index
+
+
+def _indentation(line: str) -> int:
+    """Return the width of the leading whitespace of a line"""
+    expanded_line = line.expandtabs()
+    return len(expanded_line) - len(expanded_line.lstrip())
+
+
+def _block_end(lines: List[str], start: int) -> int:
+    """
+    Find the (0-based) last line of a block starting at the given line,
+    either by matching braces or by indentation
+    """
+    # brace delimited block if a brace opens on the definition line
+    if "{" in lines[start]:
+        depth = 0
+        for i in range(start, len(lines)):
+            depth += lines[i].count("{") - lines[i].count("}")
+            if depth <= 0:
+                return i
+        return len(lines) - 1
+
+    indent = _indentation(lines[start])
+    end = start
+    for i in range(start + 1, len(lines)):
+        line = lines[i]
+        if line.strip() == "":
+            continue
+        if _indentation(line) <= indent:
+            # include closing keywords of e.g. ruby or lua blocks
+            if line.strip().startswith("end"):
+                end = i
+            break
+        end = i
+
+    return end
+
+
+def _regex_symbol_index(source: str) -> Dict[str, Tuple[int, int]]:
+    """Build a symbol index for any language from definition keywords and block layout"""
+    index: Dict[str, Tuple[int, int]] = {}
+    lines = source.splitlines()
+    # stack of the enclosing definitions as (name, last line)
+    parents: List[Tuple[str, int]] = []
+    for i, line in enumerate(lines):
+        m = DEFINITION_PATTERN.match(line)
+        if not m:
+            continue
+        while len(parents) != 0 and parents[-1][1] < i:
+            parents.pop()
+        name = ".".join([p[0] for p in parents] + [m.group("name")])
+        end = _block_end(lines, i)
+        index.setdefault(name, (i + 1, end + 1))
+        parents.append((m.group("name"), end))
+
+    return index
+
+
+def _build_symbol_index(source: str, file_name: str) -> Dict[str, Tuple[int, int]]:
+    """Build a symbol index with the best available parser for the file"""
+    # end line numbers of ast nodes are only available since python 3.8
+    if file_name.endswith(PYTHON_SUFFIXES) and sys.version_info >= (3, 8):
+        try:
+            return _python_symbol_index(source)
+        except SyntaxError:
+            logging.debug(f"Could not parse '{file_name}', using regex fallback")
+
+    return _regex_symbol_index(source)
+
+
+def _get_symbol_index(
+    source: str,
+    file_name: str,
+    cache_path: Path = SYMBOL_CACHE_PATH,
+) -> Dict[str, Tuple[int, int]]:
+    """Return the symbol index of a source file, cached by the hash of its content"""
+    kind = "python" if file_name.endswith(PYTHON_SUFFIXES) else "regex"
+    digest = hashlib.sha256(
+        f"{SYMBOL_INDEX_VERSION}:{kind}:{sys.version_info[:2]}:".encode()
+        + source.encode("utf-8"),
+    ).hexdigest()
+    cache_file = cache_path / f"{digest}.json"
+
+    try:
+        with open(cache_file, "r") as f:
+            return {name: (span[0], span[1]) for name, span in json.load(f).items()}
+    except (OSError, ValueError):
+        pass
+
+    index = _build_symbol_index(source, file_name)
+
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        logging.debug(f"Could not write symbol index cache at {cache_path}")
+
+    return index
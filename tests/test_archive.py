@@ -0,0 +1,112 @@
+import functools
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from quick_gist import commands
+from quick_gist.archive import _read_archive_members
+from quick_gist.commands import _parse_file_argument
+from quick_gist.commands import _read_files
+from quick_gist.symbols import _get_symbol_index
+
+
+def _read_all(member_name, member_file):
+    return member_file.read()
+
+
+def _add_tar_member(tar_file, name, content):
+    tar_info = tarfile.TarInfo(name)
+    tar_info.size = len(content)
+    tar_file.addfile(tar_info, io.BytesIO(content))
+
+
+def test_read_tar_members(tmp_path):
+    """Test reading selected members of a compressed tar archive"""
+    archive_path = tmp_path / "build.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as tar_file:
+        _add_tar_member(tar_file, "./logs/test.log", b"line 1\nline 2\n")
+        _add_tar_member(tar_file, "logs/build.log", b"build\n")
+        _add_tar_member(tar_file, "other.txt", b"other\n")
+
+    members = _read_archive_members(
+        archive_path,
+        {"logs/test.log", "logs/build.log", "missing.txt"},
+        _read_all,
+    )
+
+    assert members == {
+        "logs/test.log": b"line 1\nline 2\n",
+        "logs/build.log": b"build\n",
+    }
+
+
+def test_read_zip_members(tmp_path):
+    """Test reading selected members of a zip archive"""
+    archive_path = tmp_path / "build.zip"
+    with zipfile.ZipFile(archive_path, "w") as zip_file:
+        zip_file.writestr("logs/test.log", "line 1\n")
+        zip_file.writestr("other.txt", "other\n")
+
+    members = _read_archive_members(archive_path, {"logs/test.log"}, _read_all)
+
+    assert members == {"logs/test.log": b"line 1\n"}
+
+
+def test_read_invalid_archive(tmp_path):
+    """Test that an invalid archive raises an IOError"""
+    archive_path = tmp_path / "build.tar.gz"
+    archive_path.write_bytes(b"not an archive")
+
+    with pytest.raises(IOError):
+        _read_archive_members(archive_path, {"logs/test.log"}, _read_all)
+
+
+def test_read_tar_members_partially(tmp_path):
+    """Test that members can be read partially while streaming the archive"""
+    archive_path = tmp_path / "build.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as tar_file:
+        _add_tar_member(tar_file, "big.log", b"first\n" + b"x" * 100000 + b"\n")
+        _add_tar_member(tar_file, "small.log", b"small\n")
+
+    members = _read_archive_members(
+        archive_path,
+        {"big.log", "small.log"},
+        lambda member_name, member_file: member_file.readline(),
+    )
+
+    assert members == {"big.log": b"first\n", "small.log": b"small\n"}
+
+
+def test_read_files_from_archive(tmp_path, monkeypatch):
+    """Test selecting lines and symbols of archive members"""
+    monkeypatch.setattr(
+        commands,
+        "_get_symbol_index",
+        functools.partial(_get_symbol_index, cache_path=tmp_path / "symbols"),
+    )
+    archive_path = tmp_path / "build.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as tar_file:
+        _add_tar_member(tar_file, "logs/test.log", b"a\nb\nc\n")
+        _add_tar_member(
+            tar_file,
+            "src/app.py",
+            b"import os\n\n\ndef main():\n    pass\n",
+        )
+
+    files = [
+        _parse_file_argument(f"{archive_path}::{file_argument}")
+        for file_argument in [
+            "logs/test.log[2]",
+            "logs/test.log[1,3]",
+            "src/app.py[def:main]",
+        ]
+    ]
+    parsed_files = _read_files(files)
+
+    assert list(parsed_files.values()) == [
+        {"content": "b\n"},
+        {"content": "a\nc\n"},
+        {"content": "def main():\n    pass\n"},
+    ]
@@ -0,0 +1,281 @@
+import argparse
+import logging
+import threading
+from concurrent.futures import Future
+
+import pytest
+import yaml
+
+from quick_gist import commands
+from quick_gist.commands import _parse_file_argument
+from quick_gist.commands import _parse_line_numbers
+from quick_gist.commands import _read_files
+from quick_gist.commands import _select_lines
+from quick_gist.commands import command_new
+from quick_gist.commands import command_rotate_password
+from quick_gist.commands import RegexSelection
+from quick_gist.credentials import _password_decrypt
+from quick_gist.credentials import _password_encrypt
+
+TEST_LOG_LINES = [
+    "setup\n",
+    "BEGIN test_a\n",
+    "ERROR something failed\n",
+    "traceback 1\n",
+    "traceback 2\n",
+    "END test_a\n",
+    "BEGIN test_b\n",
+    "END test_b\n",
+]
+
+
+def test_parse_line_numbers_mixed_selections():
+    """Test parsing line numbers, symbols and regex selections"""
+    line_numbers = _parse_line_numbers("1-5,/ERROR/,+2,def:main,/BEGIN/../END/,10")
+
+    assert line_numbers[0] == (1, 5)
+    assert isinstance(line_numbers[1], RegexSelection)
+    assert line_numbers[1].start.pattern == "ERROR"
+    assert line_numbers[1].end is None
+    assert line_numbers[1].context == 2
+    assert line_numbers[2] == "main"
+    assert line_numbers[3].start.pattern == "BEGIN"
+    assert line_numbers[3].end.pattern == "END"
+    assert line_numbers[3].context == 0
+    assert line_numbers[4] == (10, 10)
+
+
+def test_select_lines_regex():
+    """Test regex selections with context and end patterns"""
+    assert (
+        _select_lines(TEST_LOG_LINES, _parse_line_numbers("/ERROR/,+2"), "log.txt")
+        == "ERROR something failed\ntraceback 1\ntraceback 2\n"
+    )
+    assert (
+        _select_lines(TEST_LOG_LINES, _parse_line_numbers("/BEGIN/../END/"), "log.txt")
+        == "BEGIN test_a\nERROR something failed\ntraceback 1\n"
+        "traceback 2\nEND test_a\n"
+    )
+    assert (
+        _select_lines(TEST_LOG_LINES, _parse_line_numbers("/test_b/,+5"), "log.txt")
+        == "BEGIN test_b\nEND test_b\n"
+    )
+
+
+def test_select_lines_stops_early():
+    """Test that the lines are only consumed until all selections are complete"""
+    consumed_lines = []
+
+    def lines():
+        for line in TEST_LOG_LINES:
+            consumed_lines.append(line)
+            yield line
+
+    content = _select_lines(lines(), _parse_line_numbers("2,/ERROR/"), "log.txt")
+
+    assert content == "BEGIN test_a\nERROR something failed\n"
+    assert len(consumed_lines) == 3
+
+
+def test_select_lines_missing(caplog):
+    """Test that incomplete selections are skipped"""
+    with caplog.at_level(logging.WARNING):
+        content = _select_lines(
+            TEST_LOG_LINES,
+            _parse_line_numbers("7-20,/NOPE/,/ERROR/../NOPE/"),
+            "log.txt",
+        )
+
+    assert content == ""
+    assert "Line 20 does not exist in file 'log.txt'" in caplog.text
+    assert "No line matches '/NOPE/'" in caplog.text
+    assert "No line matches the end of '/ERROR/../NOPE/'" in caplog.text
+
+
+def test_read_files_regex_selection(tmp_path):
+    """Test reading a file with numeric and regex selections"""
+    log_path = tmp_path / "log.txt"
+    log_path.write_text("".join(TEST_LOG_LINES))
+
+    file_descriptor = _parse_file_argument("log.txt[/ERROR/,+1,1]")
+    file_descriptor = file_descriptor._replace(path=log_path)
+    parsed_files = _read_files([file_descriptor])
+
+    assert parsed_files["log.txt"]["content"] == (
+        "ERROR something failed\ntraceback 1\nsetup\n"
+    )
+
+
+def _write_test_users(config_path, passwords):
+    """Write a configuration with one encrypted user per given password"""
+    users = []
+    for user_name, password in passwords.items():
+        token = _password_encrypt(
+            message=f"{user_name}_token".encode("utf-8"),
+            password=password,
+            iterations=1000,
+        ).decode("utf-8")
+        users.append({user_name: {"auth": token, "encrypted": True}})
+    users.append({"plain": {"auth": "plain_token", "encrypted": False}})
+    with open(config_path, "w") as f:
+        yaml.dump({"default": {"publish": "private"}, "user": users}, f)
+
+
+def _patch_passwords(monkeypatch, passwords):
+    answers = iter(passwords)
+    monkeypatch.setattr(commands.getpass, "getpass", lambda prompt: next(answers))
+
+
+def test_rotate_password(tmp_path, monkeypatch, capsys):
+    """Test rotating the password of users in the configuration and in ENV"""
+    config_path = tmp_path / "quick-gist-config.yaml"
+    _write_test_users(config_path, {"alice": "old", "bob": "old"})
+    # move the token of bob into an environment variable
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    monkeypatch.setenv("QUICK_GIST_BOB_AUTH", config["user"][1]["bob"]["auth"])
+    config["user"][1]["bob"]["auth"] = "env"
+    with open(config_path, "w") as f:
+        yaml.dump(config, f)
+    monkeypatch.setattr(commands, "FULL_CONFIG_PATH", config_path)
+    _patch_passwords(monkeypatch, ["old", "new", "new"])
+
+    command_rotate_password(argparse.Namespace(user=None))
+
+    with open(config_path) as f:
+        users = yaml.safe_load(f)["user"]
+    alice_token = users[0]["alice"]["auth"].encode("utf-8")
+    assert _password_decrypt(token=alice_token, password="new") == b"alice_token"
+    assert users[1]["bob"]["auth"] == "env"
+    assert users[2]["plain"]["auth"] == "plain_token"
+    # the new token of bob is printed instead of written
+    output = capsys.readouterr().out
+    assert "QUICK_GIST_BOB_AUTH" in output
+    bob_token = output.split("API-Token (encrypted): ")[1].strip().encode("utf-8")
+    assert _password_decrypt(token=bob_token, password="new") == b"bob_token"
+
+
+def test_rotate_password_aborts_on_invalid_password(tmp_path, monkeypatch):
+    """Test that no user is changed if the password of one user is wrong"""
+    config_path = tmp_path / "quick-gist-config.yaml"
+    _write_test_users(config_path, {"alice": "old", "bob": "other"})
+    config_before = config_path.read_text()
+    monkeypatch.setattr(commands, "FULL_CONFIG_PATH", config_path)
+    _patch_passwords(monkeypatch, ["old", "new", "new"])
+
+    with pytest.raises(SystemExit):
+        command_rotate_password(argparse.Namespace(user=None))
+
+    assert config_path.read_text() == config_before
+
+
+def _new_args(**kwargs):
+    args = {
+        "files": ["a.txt"],
+        "git_diff": None,
+        "softfail": False,
+        "scan": None,
+        "user": None,
+        "public": False,
+        "description": "test",
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def _patch_new_command(monkeypatch, tmp_path, events):
+    """Patch everything command_new talks to and record the order of the calls"""
+    config_path = tmp_path / "quick-gist-config.yaml"
+    config = {"default": {"publish": "private"}, "user": [{"alice": {}}]}
+    with open(config_path, "w") as f:
+        yaml.dump(config, f)
+    monkeypatch.setattr(commands, "FULL_CONFIG_PATH", config_path)
+    monkeypatch.setattr(commands, "_increment_counter", lambda *args: None)
+    monkeypatch.setattr(
+        commands,
+        "_prewarm_github_session",
+        lambda session: events.append(("prewarm", session)),
+    )
+
+    def unlock_api_token(user_configuration, user_name):
+        events.append(("password", None))
+        return "token"
+
+    monkeypatch.setattr(commands, "_unlock_api_token", unlock_api_token)
+
+
+def test_command_new_pipeline(tmp_path, monkeypatch, capsys):
+    """Test that the prewarmed session is used to post the read files"""
+    events = []
+    _patch_new_command(monkeypatch, tmp_path, events)
+    (tmp_path / "a.txt").write_text("content\n")
+    monkeypatch.chdir(tmp_path)
+
+    def post_github_gist(gist_content, api_token, session):
+        events.append(("post", session))
+        assert gist_content.files == {"a.txt": {"content": "content\n"}}
+        assert api_token == "token"
+        return "https://gist.github.com/a"
+
+    monkeypatch.setattr(commands, "_post_github_gist", post_github_gist)
+
+    command_new(_new_args())
+
+    assert [event for event, _ in events] in (
+        ["prewarm", "password", "post"],
+        ["password", "prewarm", "post"],
+    )
+    prewarmed_session = dict(events)["prewarm"]
+    assert prewarmed_session is not None
+    assert dict(events)["post"] is prewarmed_session
+    assert "https://gist.github.com/a" in capsys.readouterr().out
+
+
+def _run_now(function, *args):
+    """Run a background stage synchronously, so it has finished before it is checked"""
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+
+def test_command_new_fails_before_password(tmp_path, monkeypatch):
+    """Test that a failed file stage does not ask for the password"""
+    events = []
+    _patch_new_command(monkeypatch, tmp_path, events)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(commands, "_run_in_background", _run_now)
+
+    with pytest.raises(SystemExit):
+        command_new(_new_args(files=["missing.txt"]))
+
+    assert ("password", None) not in events
+
+
+def test_command_new_interrupt_does_not_wait_for_files(tmp_path, monkeypatch):
+    """Test that an interrupt at the password prompt does not wait for the files"""
+    events = []
+    _patch_new_command(monkeypatch, tmp_path, events)
+    release_reading = threading.Event()
+    finished_reading = []
+
+    def collect_files(*args):
+        # stands in for reading a very large file
+        release_reading.wait(timeout=10)
+        finished_reading.append(True)
+        return {}
+
+    def unlock_api_token(user_configuration, user_name):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(commands, "_collect_files", collect_files)
+    monkeypatch.setattr(commands, "_unlock_api_token", unlock_api_token)
+
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            command_new(_new_args())
+        assert finished_reading == []
+    finally:
+        release_reading.set()
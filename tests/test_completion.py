@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+from quick_gist.completion import _complete
+from quick_gist.completion import _read_completion_cache
+from quick_gist.completion import _write_completion_cache
+from quick_gist.completion import SCAN_POLICIES
+from quick_gist.scan import SCAN_POLICIES as SECRET_SCAN_POLICIES
+
+
+def test_complete_commands():
+    """Test completion of the subcommands"""
+    assert _complete([""]) == [
+        "add-user",
+        "remove-user",
+        "list-user",
+        "new",
+        "completion",
+        "metrics",
+        "rotate-password",
+        "mirror",
+        "prune",
+        "history",
+        "diff",
+    ]
+    assert _complete(["li"]) == ["list-user"]
+
+
+def test_complete_users_from_cache(tmp_path):
+    """Test completion of user names from the completion cache"""
+    cache_path = tmp_path / "completion-cache"
+    _write_completion_cache(user_names=["alice", "bob", "alfred"], path=cache_path)
+
+    assert _read_completion_cache(path=cache_path) == ["alice", "bob", "alfred"]
+    assert _complete(["new", "-u", "al"], path=cache_path) == ["alice", "alfred"]
+    assert _complete(["new", "--user", ""], path=cache_path) == [
+        "alice",
+        "bob",
+        "alfred",
+    ]
+
+
+def test_complete_missing_cache(tmp_path):
+    """Test that a missing completion cache does not fail"""
+    assert _complete(["new", "-u", ""], path=tmp_path / "missing") == []
+
+
+def test_completion_does_not_import_heavy_dependencies():
+    """Test that the completion module only depends on the standard library"""
+    code = (
+        "import sys, quick_gist.completion; "
+        "print(any(m in sys.modules for m in "
+        "('yaml', 'requests', 'cryptography', 'quick_gist.scan')))"
+    )
+    ret = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert ret.stdout.strip() == "False"
+
+
+def test_complete_scan_policies():
+    """Test completion of the secret scan policies"""
+    assert SCAN_POLICIES == SECRET_SCAN_POLICIES
+    assert _complete(["new", "-s", ""]) == ["redact", "abort"]
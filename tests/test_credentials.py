@@ -10,6 +10,7 @@ from quick_gist.credentials import _create_default_user_config
 from quick_gist.credentials import _create_user_config_dir
 from quick_gist.credentials import _password_decrypt
 from quick_gist.credentials import _password_encrypt
+from quick_gist.credentials import _password_reencrypt
 from quick_gist.credentials import _read_user_config
 from quick_gist.credentials import _write_user_config
 from quick_gist.credentials import crypto_iterations
@@ -66,6 +67,49 @@ def test_password_encrypt_decrypt_wrong_password():
     assert str(exc_info.value) == "Invalid Password"
 
 
+def test_password_reencrypt():
+    """Test encryption of an encrypted message with a new password"""
+    test_message = "secret test message"
+    test_password = "testpassword42"
+    new_password = "newpassword42"
+
+    encrypted_message = _password_encrypt(
+        message=test_message.encode("utf-8"),
+        password=test_password,
+        iterations=1000,
+    )
+    reencrypted_message = _password_reencrypt(
+        token=encrypted_message,
+        old_password=test_password,
+        new_password=new_password,
+    )
+
+    assert reencrypted_message is not None
+    decrypted_message = _password_decrypt(
+        token=reencrypted_message,
+        password=new_password,
+    )
+    assert decrypted_message.decode("utf-8") == test_message
+
+
+def test_password_reencrypt_wrong_password():
+    """Test encryption with a new password if the old password is wrong"""
+    encrypted_message = _password_encrypt(
+        message=b"secret test message",
+        password="testpassword42",
+        iterations=1000,
+    )
+
+    assert (
+        _password_reencrypt(
+            token=encrypted_message,
+            old_password="wrong_password",
+            new_password="newpassword42",
+        )
+        is None
+    )
+
+
 def test_check_user_config_existance():
     """Test the check of an existing user configuration file"""
     # check non existing user_configuration
@@ -148,11 +192,26 @@ def test_read_write_user_config():
     read_test_user_config = _read_user_config(path=TEST_FULL_CONFIG_PATH)
 
     assert read_test_user_config == test_user_config
+    # the configuration is written atomically via a temporary file
+    assert not Path(f"{TEST_FULL_CONFIG_PATH}.tmp").exists()
 
     # clean up test directory
     shutil.rmtree(path=Path(".config"))
 
 
+def test_write_user_config_keeps_permissions(tmp_path):
+    """Test that writing a configuration does not widen its permissions"""
+    config_path = tmp_path / TEST_USER_CONFIG_NAME
+    _write_user_config(path=config_path, data={"user": None})
+
+    assert config_path.stat().st_mode & 0o777 == 0o600
+
+    os.chmod(config_path, 0o640)
+    _write_user_config(path=config_path, data={"user": None})
+
+    assert config_path.stat().st_mode & 0o777 == 0o640
+
+
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_testdir(request):
     """Clean up test directory and remove configuration dir if needed"""
@@ -0,0 +1,71 @@
+import subprocess
+
+import pytest
+
+from quick_gist.commands import _parse_file_argument
+from quick_gist.commands import _read_files
+from quick_gist.git import _read_git_diff
+from quick_gist.git import GitCatFile
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Create a git repository with two commits of the same file"""
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "test")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("first\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "first")
+    (tmp_path / "src" / "app.py").write_text("first\nsecond\n")
+    git("commit", "-q", "-am", "second")
+
+    return tmp_path
+
+
+def test_git_cat_file_read_revisions(git_repo):
+    """Test reading the same file from different revisions with one process"""
+    with GitCatFile(cwd=str(git_repo)) as git_cat_file:
+        assert git_cat_file.read("HEAD:src/app.py") == b"first\nsecond\n"
+        assert git_cat_file.read("HEAD~1:src/app.py") == b"first\n"
+
+
+def test_git_cat_file_missing_and_tree(git_repo):
+    """Test that missing objects and directories raise an IOError"""
+    with GitCatFile(cwd=str(git_repo)) as git_cat_file:
+        with pytest.raises(IOError):
+            git_cat_file.read("HEAD:does_not_exist.py")
+        with pytest.raises(IOError):
+            git_cat_file.read("HEAD:src")
+        # the process is still usable after an error
+        assert git_cat_file.read("HEAD~1:src/app.py") == b"first\n"
+
+
+def test_read_git_diff(git_repo):
+    """Test creating a diff between two revisions"""
+    diff = _read_git_diff("HEAD~1..HEAD", cwd=str(git_repo))
+
+    assert "+second" in diff
+
+
+def test_read_files_same_name_at_revisions(git_repo, monkeypatch):
+    """Test that files with the same name do not overwrite each other"""
+    (git_repo / "app.py").write_text("top level\n")
+    monkeypatch.chdir(git_repo)
+    files = [
+        _parse_file_argument(file_argument)
+        for file_argument in ["HEAD:src/app.py", "HEAD~1:src/app.py", "app.py"]
+    ]
+
+    parsed_files = _read_files(files)
+
+    assert parsed_files == {
+        "HEAD_src_app.py": {"content": "first\nsecond\n"},
+        "HEAD~1_src_app.py": {"content": "first\n"},
+        "app.py": {"content": "top level\n"},
+    }
@@ -0,0 +1,59 @@
+from quick_gist import history
+from quick_gist.history import _diff_revisions
+from quick_gist.history import _fetch_revision
+from quick_gist.history import _find_stored_versions
+from quick_gist.history import _load_revision
+from quick_gist.history import _save_revision
+
+
+def test_revision_store(tmp_path):
+    """Test that revisions are stored and file contents are deduplicated"""
+    _save_revision(tmp_path, "abc", "1111", {"a.txt": b"a\n", "b.txt": b"b\n"})
+    _save_revision(tmp_path, "abc", "2222", {"a.txt": b"a\n", "b.txt": b"c\n"})
+
+    assert _load_revision(tmp_path, "abc", "1111") == {"a.txt": b"a\n", "b.txt": b"b\n"}
+    assert _load_revision(tmp_path, "abc", "3333") is None
+    assert _find_stored_versions(tmp_path, "abc", "2") == ["2222"]
+    assert _find_stored_versions(tmp_path, "abc", "") == ["1111", "2222"]
+    # the unchanged file a.txt is only stored once
+    assert len(list((tmp_path / "objects").glob("*/*"))) == 3
+
+
+def test_fetch_revision_truncated_file(tmp_path, monkeypatch):
+    """Test that truncated files are downloaded from their raw url"""
+    monkeypatch.setattr(
+        history,
+        "_get_github_gist_revision",
+        lambda gist_id, version, api_token: {
+            "files": {
+                "a.txt": {"content": "a\n", "truncated": False},
+                "big.txt": {
+                    "content": "trunc",
+                    "truncated": True,
+                    "raw_url": "https://raw/big.txt",
+                },
+            },
+        },
+    )
+    monkeypatch.setattr(history, "_get_github_raw_content", lambda url: b"complete\n")
+
+    files = _fetch_revision(tmp_path, "abc", "1111", api_token="token")
+
+    assert files == {"a.txt": b"a\n", "big.txt": b"complete\n"}
+    assert _load_revision(tmp_path, "abc", "1111") == files
+
+
+def test_diff_revisions():
+    """Test the diff of changed, added and removed files"""
+    diff = _diff_revisions(
+        {"a.txt": b"a\nb\n", "old.txt": b"old\n"},
+        {"a.txt": b"a\nc\n", "new.txt": b"new"},
+        "11111111aaaa",
+        "22222222bbbb",
+    )
+
+    assert "--- 11111111/a.txt\n+++ 22222222/a.txt\n" in diff
+    assert "-b\n+c\n" in diff
+    assert "--- /dev/null\n+++ 22222222/new.txt\n" in diff
+    assert "+new\n\\ No newline at end of file\n" in diff
+    assert "--- 11111111/old.txt\n+++ /dev/null\n" in diff
@@ -0,0 +1,68 @@
+from quick_gist.metrics import _format_metrics
+from quick_gist.metrics import _increment_counter
+from quick_gist.metrics import _observe_histogram
+from quick_gist.metrics import _read_metrics
+from quick_gist.metrics import _set_gauge
+
+
+def test_metrics_are_cumulative(tmp_path):
+    """Test that metrics are accumulated across multiple updates"""
+    metrics_path = tmp_path / "metrics.json"
+    _increment_counter(
+        "quick_gist_gists_created_total",
+        {"user": "a"},
+        path=metrics_path,
+    )
+    _increment_counter(
+        "quick_gist_gists_created_total",
+        {"user": "a"},
+        path=metrics_path,
+    )
+    _increment_counter(
+        "quick_gist_gists_created_total",
+        {"user": "b"},
+        path=metrics_path,
+    )
+    _set_gauge("quick_gist_rate_limit_remaining", {}, 4999, path=metrics_path)
+    _set_gauge("quick_gist_rate_limit_remaining", {}, 4998, path=metrics_path)
+
+    store = _read_metrics(path=metrics_path)
+
+    assert store["quick_gist_gists_created_total"] == {'user="a"': 2, 'user="b"': 1}
+    assert store["quick_gist_rate_limit_remaining"] == {"": 4998}
+
+
+def test_format_metrics(tmp_path):
+    """Test the prometheus text exposition format"""
+    metrics_path = tmp_path / "metrics.json"
+    _increment_counter(
+        "quick_gist_gists_failed_total",
+        {"user": "a"},
+        path=metrics_path,
+    )
+    _set_gauge("quick_gist_rate_limit_remaining", {}, 10, path=metrics_path)
+    for duration in (0.2, 0.7, 20.0):
+        _observe_histogram(
+            "quick_gist_api_request_duration_seconds",
+            {"endpoint": "create_gist"},
+            duration,
+            path=metrics_path,
+        )
+
+    metrics_str = _format_metrics(_read_metrics(path=metrics_path))
+
+    assert "# TYPE quick_gist_gists_failed_total counter" in metrics_str
+    assert 'quick_gist_gists_failed_total{user="a"} 1\n' in metrics_str
+    assert "quick_gist_rate_limit_remaining 10\n" in metrics_str
+    assert (
+        "quick_gist_api_request_duration_seconds_bucket"
+        '{endpoint="create_gist",le="0.25"} 1\n' in metrics_str
+    )
+    assert (
+        "quick_gist_api_request_duration_seconds_bucket"
+        '{endpoint="create_gist",le="+Inf"} 3\n' in metrics_str
+    )
+    assert (
+        'quick_gist_api_request_duration_seconds_count{endpoint="create_gist"} 3\n'
+        in metrics_str
+    )
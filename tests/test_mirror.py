@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from quick_gist import mirror
+from quick_gist.main import main
+from quick_gist.mirror import _load_mirror_state
+from quick_gist.mirror import _mirror_gists
+from quick_gist.mirror import _save_mirror_state
+
+
+def _test_gist(gist_id, updated_at, file_names):
+    return {
+        "id": gist_id,
+        "description": "test gist",
+        "public": False,
+        "updated_at": updated_at,
+        "files": {
+            name: {"raw_url": f"https://raw/{gist_id}/{name}"} for name in file_names
+        },
+    }
+
+
+def _fake_download(raw_url, path):
+    content = raw_url.encode("utf-8")
+    path.write_bytes(content)
+    return len(content)
+
+
+def test_mirror_gists_incremental(tmp_path, monkeypatch):
+    """Test that only changed gists are downloaded again"""
+    downloaded_urls = []
+
+    def download(raw_url, path):
+        downloaded_urls.append(raw_url)
+        return _fake_download(raw_url, path)
+
+    monkeypatch.setattr(mirror, "_download_github_raw_file", download)
+
+    state = _load_mirror_state(tmp_path)
+    gists = [
+        _test_gist("a", "2022-01-01T00:00:00Z", ["a.txt", "b.txt"]),
+        _test_gist("b", "2022-01-02T00:00:00Z", ["c.txt"]),
+    ]
+    result = _mirror_gists(gists, tmp_path, state)
+    _save_mirror_state(tmp_path, state)
+
+    assert result.mirrored == 2
+    assert (tmp_path / "a" / "b.txt").read_text() == "https://raw/a/b.txt"
+    assert _load_mirror_state(tmp_path)["since"] == "2022-01-02T00:00:00Z"
+
+    # gist b is returned again (since is inclusive) but did not change
+    downloaded_urls.clear()
+    gists = [
+        _test_gist("a", "2022-01-03T00:00:00Z", ["a.txt"]),
+        _test_gist("b", "2022-01-02T00:00:00Z", ["c.txt"]),
+    ]
+    result = _mirror_gists(gists, tmp_path, state)
+
+    assert result.mirrored == 1
+    assert downloaded_urls == ["https://raw/a/a.txt"]
+    # deleted files are removed from the mirror
+    assert not (tmp_path / "a" / "b.txt").exists()
+    assert state["since"] == "2022-01-03T00:00:00Z"
+
+
+def test_mirror_gists_failed_download(tmp_path, monkeypatch):
+    """Test that failed gists are retried in the next run"""
+
+    def download(raw_url, path):
+        raise requests.exceptions.ConnectionError()
+
+    monkeypatch.setattr(mirror, "_download_github_raw_file", download)
+
+    state = _load_mirror_state(tmp_path)
+    result = _mirror_gists(
+        [_test_gist("a", "2022-01-01T00:00:00Z", ["a.txt"])],
+        tmp_path,
+        state,
+    )
+
+    assert result.failed == 1
+    assert state["since"] is None
+    assert "a" not in state["gists"]
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "x"])
+def test_mirror_invalid_jobs(tmp_path, jobs, capsys):
+    """Test that the number of parallel downloads is checked when parsing"""
+    with pytest.raises(SystemExit) as exc_info:
+        main(["mirror", str(tmp_path), "-j", jobs])
+
+    assert exc_info.value.code == 2
+    assert "--jobs" in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import re
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+
+from quick_gist import prune
+from quick_gist.main import main
+from quick_gist.prune import _delete_gists
+from quick_gist.prune import _gist_matches
+from quick_gist.prune import PruneFilter
+
+TEST_GIST = {
+    "id": "a",
+    "description": "nightly build log",
+    "public": False,
+    "updated_at": "2022-01-01T00:00:00Z",
+    "files": {"build.log": {}, "notes.txt": {}},
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_gist_matches():
+    """Test that a gist has to match all filters"""
+    older_than = datetime(2022, 6, 1, tzinfo=timezone.utc)
+
+    assert _gist_matches(TEST_GIST, PruneFilter(older_than=older_than))
+    assert _gist_matches(
+        TEST_GIST,
+        PruneFilter(
+            older_than=older_than,
+            description_pattern=re.compile("^nightly"),
+            file_name_pattern="*.log",
+            public=False,
+        ),
+    )
+    assert not _gist_matches(
+        TEST_GIST,
+        PruneFilter(older_than=datetime(2021, 6, 1, tzinfo=timezone.utc)),
+    )
+    assert not _gist_matches(TEST_GIST, PruneFilter(file_name_pattern="*.py"))
+    assert not _gist_matches(TEST_GIST, PruneFilter(public=True))
+
+
+def test_delete_gists_rate_limit(monkeypatch):
+    """Test that deletions are retried after the rate limit was exceeded"""
+    responses = {
+        "a": [FakeResponse(403, {"Retry-After": "0"}), FakeResponse(204)],
+        "b": [FakeResponse(204)],
+        "c": [FakeResponse(500)],
+    }
+
+    def delete(gist_id, api_token):
+        return responses[gist_id].pop(0)
+
+    monkeypatch.setattr(prune, "_delete_github_gist", delete)
+
+    status_codes = _delete_gists(["a", "b", "c"], api_token="token", jobs=2)
+
+    assert status_codes == {"a": 204, "b": 204, "c": 500}
+
+
+@pytest.mark.parametrize("jobs", ["0", "-3"])
+def test_prune_invalid_jobs(jobs, capsys):
+    """Test that the number of concurrent deletions is checked when parsing"""
+    with pytest.raises(SystemExit) as exc_info:
+        main(["prune", "--older-than", "30", "-j", jobs])
+
+    assert exc_info.value.code == 2
+    assert "--jobs" in capsys.readouterr().err
@@ -0,0 +1,73 @@
+import json
+
+from quick_gist.symbols import _get_symbol_index
+from quick_gist.symbols import _python_symbol_index
+from quick_gist.symbols import _regex_symbol_index
+
+TEST_PYTHON_SOURCE = """import os
+
+
+class MyClass:
+    def __init__(self):
+        self.a = 1
+
+    @property
+    def method(self):
+        return self.a
+
+
+def main():
+    pass
+"""
+
+TEST_JS_SOURCE = """const a = 1;
+
+class Greeter {
+    greet(name) {
+        return name;
+    }
+}
+
+function main() {
+    if (a) {
+        return 1;
+    }
+}
+"""
+
+
+def test_python_symbol_index():
+    """Test that classes, methods (with decorators) and functions are found"""
+    index = _python_symbol_index(TEST_PYTHON_SOURCE)
+
+    assert index["MyClass"] == (4, 10)
+    assert index["MyClass.__init__"] == (5, 6)
+    assert index["MyClass.method"] == (8, 10)
+    assert index["main"] == (13, 14)
+
+
+def test_regex_symbol_index():
+    """Test the regex fallback for brace delimited languages"""
+    index = _regex_symbol_index(TEST_JS_SOURCE)
+
+    assert index["Greeter"] == (3, 7)
+    assert index["main"] == (9, 13)
+
+
+def test_get_symbol_index_cache(tmp_path):
+    """Test that the symbol index is cached by the content of the file"""
+    index = _get_symbol_index(TEST_PYTHON_SOURCE, "test.py", cache_path=tmp_path)
+    cache_files = list(tmp_path.glob("*.json"))
+
+    assert len(cache_files) == 1
+
+    # a cached index is used instead of parsing the file again
+    with open(cache_files[0], "w") as f:
+        json.dump({"cached": [1, 2]}, f)
+
+    assert _get_symbol_index(
+        TEST_PYTHON_SOURCE,
+        "test.py",
+        cache_path=tmp_path,
+    ) == {"cached": (1, 2)}
+    assert index["main"] == (13, 14)